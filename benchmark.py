@@ -0,0 +1,275 @@
+# Benchmarks of the model: import times, and the search, activation,
+# decision and training functions on synthetic layouts of growing size.
+# Results are saved as JSON baselines in benchmarks/ to compare later
+# runs against:
+#
+#   python benchmark.py --save benchmarks/baseline.json
+#   python benchmark.py --compare benchmarks/baseline.json
+
+import argparse
+import datetime
+import io
+import json
+import contextlib
+import math
+import platform
+import random
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+# Import paths to time, each run in a fresh interpreter: the modelling
+# core alone, and with the plotting and the layouts loaded.
+import_statements = {
+    "ui": "import ui",
+    "ui + visualise": "import ui; ui.visualise_UI",
+    "ui + layouts": "import ui; ui.big_ui; ui.disj_large",
+    "decision": "import decision",
+    "decision + decision_ui": "import decision; decision.decision_ui",
+    "decision2": "import decision2",
+    "decision2 + decision_ui": "import decision2; decision2.decision_ui",
+    }
+
+_import_probe = """
+import sys, time
+t = time.perf_counter()
+{}
+t = time.perf_counter() - t
+print(t, "matplotlib" in sys.modules)
+"""
+
+# Time each import statement in a new python process, repeats times.
+# Returns a dict of the median seconds and whether matplotlib got
+# imported, by name.
+def import_times(statements = import_statements, repeats = 5):
+    results = {}
+    for name, statement in statements.items():
+        times = []
+        for i in range(repeats):
+            out = subprocess.run([sys.executable, "-c", _import_probe.format(statement)], cwd = here,
+                                 capture_output = True, text = True, check = True).stdout.split()
+            times.append(float(out[0]))
+        results[name] = {"seconds": statistics.median(times), "matplotlib": out[1] == "True"}
+    return results
+
+def print_import_times(results):
+    for name, r in results.items():
+        print(name.ljust(28), str(round(r["seconds"]*1000, 1)).rjust(8), "ms", "(matplotlib)" if r["matplotlib"] else "")
+
+# A layout of n elements of random sizes, colours and frequencies,
+# jittered on a square grid so that the density stays the same at every
+# size.
+def synthetic_layout(n, seed = 0):
+    import ui
+    r = random.Random(seed)
+    k = int(math.ceil(math.sqrt(n)))
+    layout = ui.ui(k*80, k*80)
+    for i in range(n):
+        layout.add_element("e" + str(i), (i % k)*80 + r.randint(0, 20), (i // k)*80 + r.randint(0, 20),
+                           r.randint(20, 50), r.randint(15, 40), color = r.choice(["red", "green", "blue", "grey"]),
+                           frequency = r.choice([0.05, 0.1, 0.3]))
+    return layout
+
+# Call f with each of args in turn, going round again until min_time
+# has passed (but at least once each). Returns the mean seconds per
+# call and the number of calls.
+def time_calls(f, args, min_time = 0.2):
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        for a in args:
+            f(*a)
+            calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return {"seconds": elapsed / calls, "calls": calls}
+
+# The largest layouts each function is run on by default. The plain
+# exhaustive search is cubic in the number of elements and make_decision
+# searches half of them, so they stop earlier.
+default_limits = {
+    "build": None,
+    "total_activation": None,
+    "exhaustive_visual_search": 1000,
+    "exhaustive_guided_visual_search": None,
+    "make_decision": 1000,
+    "make_decisions": 1000,
+    }
+
+# Time the functions on synthetic layouts of each size. Every function
+# gets the same random starts, targets and values, from seed;
+# make_decisions is timed per trial over batch_trials trials at once.
+def run_sizes(sizes = (10, 100, 1000, 10000), min_time = 0.2, limits = default_limits, seed = 0, trials = 5, batch_trials = 1000):
+    import decision
+    results = {}
+    for n in sizes:
+        r = random.Random(seed)
+        res = {}
+        def allowed(name):
+            return limits.get(name) is None or n <= limits[name]
+
+        start = time.perf_counter()
+        layout = synthetic_layout(n, seed)
+        res["build"] = {"seconds": time.perf_counter() - start, "calls": 1}
+        names = list(layout.elements)
+        pairs = [(r.choice(names), r.choice(names)) for i in range(trials)]
+        # The first call builds the tables; time it on its own.
+        start = time.perf_counter()
+        layout.total_activation(eye_loc = pairs[0][0])
+        res["tables"] = {"seconds": time.perf_counter() - start, "calls": 1}
+
+        if allowed("total_activation"):
+            res["total_activation"] = time_calls(lambda s, t: layout.total_activation(top_down = layout.elements[t].color, eye_loc = s), pairs, min_time)
+        if allowed("exhaustive_visual_search"):
+            res["exhaustive_visual_search"] = time_calls(lambda s, t: layout.exhaustive_visual_search(start = s, target = t), pairs, min_time)
+        if allowed("exhaustive_guided_visual_search"):
+            res["exhaustive_guided_visual_search"] = time_calls(
+                lambda s, t: layout.exhaustive_guided_visual_search(start = s, target = t, top_down = layout.elements[t].color), pairs, min_time)
+
+        values = np.array([[r.choice([-1, 1]) * r.randint(1, 9) / 10 for e in names] for i in range(trials)])
+        if allowed("make_decision"):
+            def one_decision(i):
+                element_values = dict(zip(names, values[i].tolist()))
+                decision.reset_decision_ui(layout, element_values, color = True)
+                decision.make_decision(layout, element_values)
+            res["make_decision"] = time_calls(one_decision, [(i,) for i in range(trials)], min_time)
+        if allowed("make_decisions"):
+            rng = np.random.default_rng(seed)
+            batch = rng.choice([-1, 1], (batch_trials, n)) * rng.integers(1, 10, (batch_trials, n)) / 10
+            timing = time_calls(lambda: decision.make_decisions(layout, batch, color = True), [()], min_time)
+            res["make_decisions"] = {"seconds": timing["seconds"] / batch_trials, "calls": timing["calls"] * batch_trials}
+        results[str(n)] = res
+    return results
+
+# Training throughput on the decision layout of decision2, one task at
+# a time and with n_envs tasks in lockstep.
+def run_training(episodes = 20000, n_envs = 256, seed = 0):
+    import decision2
+    results = {}
+    for name, envs in (("sequential", None), ("batch", n_envs)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            agent = decision2.train_decision_maker(decision2.decision_ui, colours = True, episodes = episodes, n_envs = envs, seed = seed)
+            seconds = time.perf_counter() - start
+        results[name] = {"episodes_per_second": episodes / seconds, "steps_per_second": agent.metrics.steps / seconds}
+    return results
+
+# The commit benchmarked, with -dirty if the Python files differ from it.
+def _git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd = here, capture_output = True, text = True).stdout.strip()
+        changed = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no", "--", "*.py"], cwd = here, capture_output = True, text = True).stdout.strip()
+    except OSError:
+        return None
+    return commit + "-dirty" if commit and changed else commit
+
+def run(sizes = (10, 100, 1000, 10000), min_time = 0.2, episodes = 20000, imports = True, trials = 5, batch_trials = 1000, n_envs = 256, seed = 0):
+    parameters = {"sizes": list(sizes), "min_time": min_time, "episodes": episodes, "trials": trials,
+                  "batch_trials": batch_trials, "n_envs": n_envs, "seed": seed}
+    results = {
+        "meta": {
+            "time": datetime.datetime.now().isoformat(timespec = "seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.platform(),
+            "parameters": parameters,
+            },
+        "sizes": run_sizes(sizes, min_time, seed = seed, trials = trials, batch_trials = batch_trials),
+        "training": run_training(episodes, n_envs, seed),
+        }
+    if imports:
+        results["imports"] = import_times()
+    return results
+
+# The run parameters that each kind of entry of flatten depends on.
+# min_time only sets how long each function is repeated for.
+_depends_on = {"n=": ("trials", "batch_trials", "seed"), "train ": ("episodes", "n_envs", "seed"), "import ": ()}
+
+def _parameters_differ(name, old, new):
+    for prefix, keys in _depends_on.items():
+        if name.startswith(prefix):
+            return [k for k in keys if old.get(k) != new.get(k)]
+    return []
+
+# The results as a flat dict of name: number, where a smaller number is
+# better (throughputs are turned into seconds per episode and step).
+def flatten(results):
+    flat = {}
+    for n, res in results.get("sizes", {}).items():
+        for name, r in res.items():
+            flat["n=" + n + " " + name] = r["seconds"]
+    for name, r in results.get("training", {}).items():
+        flat["train " + name + " per episode"] = 1 / r["episodes_per_second"]
+        flat["train " + name + " per step"] = 1 / r["steps_per_second"]
+    for name, r in results.get("imports", {}).items():
+        flat["import " + name] = r["seconds"]
+    return flat
+
+# Compare two results (or baseline files). Returns rows of name, old
+# seconds, new seconds and new/old, and prints them with the ones
+# slower by more than threshold marked. Entries from runs with
+# different parameters (see _depends_on) are left out, with a warning.
+def compare(old, new, threshold = 1.1, show = True):
+    if isinstance(old, str):
+        old = load(old)
+    if isinstance(new, str):
+        new = load(new)
+    old_parameters = old.get("meta", {}).get("parameters")
+    new_parameters = new.get("meta", {}).get("parameters")
+    old, new = flatten(old), flatten(new)
+    skipped = {}
+    if old_parameters is None or new_parameters is None:
+        if show:
+            print("warning: run parameters not recorded, comparing every entry")
+    else:
+        for name in new:
+            differ = _parameters_differ(name, old_parameters, new_parameters)
+            if name in old and differ:
+                skipped[name] = differ
+    rows = [(name, old[name], new[name], new[name] / old[name]) for name in new if name in old and old[name] > 0 and name not in skipped]
+    if show:
+        for name, differ in skipped.items():
+            print("warning: skipping", name + ", run with different", ", ".join(differ))
+        width = max([len(name) for name, *rest in rows] + [4])
+        for name, o, n, ratio in rows:
+            mark = "  slower" if ratio > threshold else ("  faster" if ratio < 1/threshold else "")
+            print(name.ljust(width), ("%.3g" % o).rjust(10), ("%.3g" % n).rjust(10), ("%.2fx" % ratio).rjust(8) + mark)
+    return rows
+
+def save(results, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok = True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent = 1)
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmark the model")
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [10, 100, 1000, 10000])
+    parser.add_argument("--min-time", type = float, default = 0.2, help = "seconds to repeat each function for")
+    parser.add_argument("--episodes", type = int, default = 20000)
+    parser.add_argument("--trials", type = int, default = 5, help = "trials of each function per layout size")
+    parser.add_argument("--batch-trials", type = int, default = 1000, help = "trials per make_decisions call")
+    parser.add_argument("--n-envs", type = int, default = 256, help = "tasks in lockstep for batch training")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--no-imports", action = "store_true")
+    parser.add_argument("--save", help = "write the results to this file, e.g. benchmarks/baseline.json")
+    parser.add_argument("--compare", help = "compare the results to this baseline file")
+    args = parser.parse_args()
+    results = run(args.sizes, args.min_time, args.episodes, not args.no_imports, args.trials, args.batch_trials, args.n_envs, args.seed)
+    for name, seconds in flatten(results).items():
+        print(name.ljust(48), "%.4g" % seconds)
+    if args.save:
+        save(results, args.save)
+    if args.compare:
+        print()
+        compare(args.compare, results)
@@ -1,20 +1,29 @@
 import ui
+import numpy as np
 
 # Simulate simple decision making
 
-# Make a 3x3 decision making task
-decision_ui = ui.ui()
-decision_ui.add_element("e1", 0,0,50,50)
-decision_ui.add_element("e2", 75,0,50,50)
-decision_ui.add_element("e3", 150,0,50,50)
+# Make a 3x3 decision making task. decision_ui is built on first use.
+def make_decision_ui():
+    layout = ui.ui()
+    layout.add_element("e1", 0,0,50,50)
+    layout.add_element("e2", 75,0,50,50)
+    layout.add_element("e3", 150,0,50,50)
 
-decision_ui.add_element("e4", 0,75,50,50)
-decision_ui.add_element("e5", 75,75,50,50)
-decision_ui.add_element("e6", 150,75,50,50)
+    layout.add_element("e4", 0,75,50,50)
+    layout.add_element("e5", 75,75,50,50)
+    layout.add_element("e6", 150,75,50,50)
 
-decision_ui.add_element("e7", 0,150,50,50)
-decision_ui.add_element("e8", 75,150,50,50)
-decision_ui.add_element("e9", 150,150,50,50)
+    layout.add_element("e7", 0,150,50,50)
+    layout.add_element("e8", 75,150,50,50)
+    layout.add_element("e9", 150,150,50,50)
+    return layout
+
+def __getattr__(name):
+    if name == "decision_ui":
+        globals()["decision_ui"] = make_decision_ui()
+        return globals()["decision_ui"]
+    raise AttributeError("module 'decision' has no attribute '" + name + "'")
 
 element_values1 = {
     "e1": -0.3,
@@ -53,7 +62,7 @@ def reset_decision_ui(ui, element_values, color = None):
 # reset_decision_ui(decision_ui, element_values2)
 
 
-def make_decision(ui, element_values):
+def make_decision(ui, element_values, force_fixation = None):
     start = "e1"
     pluses = 0
     minuses = 0
@@ -121,6 +130,132 @@ def make_decision(ui, element_values):
         if moved or force_fixation: start = new_target
     return mt, scanpath
 
+# Default bound on trials x visible elements squared for make_decisions.
+chunk_elements = 2**22
+
+# make_decision for many trials at once. values_2d has a row of element
+# values per trial, in the order of ui.elements, coloured as
+# reset_decision_ui would with color. The trials run in lockstep and ui
+# is only read, never modified. start is the first fixation (the first
+# element by default, which is e1 in decision_ui), the same for all
+# trials or one per trial. The trials are run chunk at a time (by
+# default as many as keep chunk x V^2 within chunk_elements, for V the
+# most elements visible from any eye location).
+#
+# Returns the decision times, the scanpath lengths and the decisions:
+# 1 for accept (the pluses, or with top-down search the greens, are the
+# majority), 0 for reject and -1 where every element was searched
+# without a majority.
+def make_decisions(ui, values_2d, color = False, start = None, force_fixation = None, chunk = None):
+    names = list(ui.elements)
+    n = len(names)
+    values = np.asarray(values_2d, dtype = float)
+    T = len(values)
+
+    # The layout is fixed: visibility, distances and fixation times
+    # are looked up.
+    visible = np.array([ui.bottom_up_activation_array(e)[1] for e in names])
+    all_elements = np.arange(n)
+    rows, cols = np.meshgrid(all_elements, all_elements, indexing = 'ij')
+    with np.errstate(divide = 'ignore'):
+        inverse_sqrt = 1 / np.sqrt(ui.element_distances(rows.ravel(), cols.ravel()).reshape(n, n))
+    emma_t, emma_moved = ui.emma_table()
+    # Ties go to the visible elements first, then the rest, each in
+    # element order, as in the activation dicts.
+    tie_rank = np.where(visible, all_elements[None,:], n + all_elements[None,:])
+    # The visible elements from each eye location, in element order,
+    # padded with element 0.
+    n_visible = visible.sum(axis = 1)
+    visible_idx = np.zeros((n, max(int(n_visible.max()), 1)), dtype = int)
+    visible_ok = np.arange(visible_idx.shape[1])[None,:] < n_visible[:,None]
+    visible_idx[visible_ok] = np.nonzero(visible)[1]
+
+    if start is None:
+        start = names[0]
+    start = np.array([ui.store.index[s] if isinstance(s, str) else s for s in np.broadcast_to(np.array(start, dtype = object), T)], dtype = int)
+    mt = np.zeros(T)
+    lengths = np.ones(T, dtype = int)
+    decisions = np.full(T, -1)
+    # The activation step makes (trials x V x V) arrays for V visible
+    # elements, so the trials are run chunk at a time.
+    if chunk is None:
+        chunk = max(1, chunk_elements // visible_idx.shape[1]**2)
+    for first in range(0, T, chunk):
+        part = slice(first, first + chunk)
+        mt[part], lengths[part], decisions[part] = _decide_chunk(values[part], color, start[part].copy(), force_fixation,
+            visible, visible_idx, visible_ok, inverse_sqrt, emma_t, emma_moved, tie_rank)
+    return mt, lengths, decisions
+
+def _decide_chunk(values, color, start, force_fixation, visible, visible_idx, visible_ok, inverse_sqrt, emma_t, emma_moved, tie_rank):
+    T, n = values.shape
+    trials = np.arange(T)
+    plus = values > 0
+    # 0 grey, 1 green, 2 red
+    colour = np.where(plus, 1, 2) if color else np.zeros((T, n), dtype = int)
+    greens = (colour == 1).sum(axis = 1)
+    top_down = np.where(greens >= n/2, 2, np.where(greens == 0, 0, 1))
+
+    searched = np.zeros((T, n), dtype = bool)
+    searched[trials, start] = True
+    mt = np.zeros(T)
+    lengths = np.ones(T, dtype = int)
+    pluses = np.zeros(T, dtype = int)
+    minuses = np.zeros(T, dtype = int)
+    decisions = np.full(T, -1)
+    active = ~searched.all(axis = 1)
+    # Bottom-up activation of each trial from its current eye location,
+    # worked out again only when the eyes move.
+    bottom_up = np.zeros((T, n))
+    stale = np.ones(T, dtype = bool)
+
+    while active.any():
+        t = trials[active]
+        s = start[t]
+        vis = visible[s]
+        redo = t[stale[t]]
+        if len(redo):
+            # Bottom-up activation of the visible elements only
+            idx = visible_idx[start[redo]]
+            ok = visible_ok[start[redo]]
+            c = np.take_along_axis(colour[redo], idx, axis = 1)
+            pairs = np.where(ok[:,None,:] & (c[:,:,None] != c[:,None,:]), inverse_sqrt[idx[:,:,None], idx[:,None,:]], 0.0)
+            activation = np.zeros((len(redo), n))
+            rows = np.broadcast_to(np.arange(len(redo))[:,None], idx.shape)
+            activation[rows[ok], idx[ok]] = np.cumsum(pairs, axis = 2)[:,:,-1][ok]
+            bottom_up[redo] = activation
+            stale[redo] = False
+        activation = bottom_up[t]
+        td = top_down[t] > 0
+        matches = colour[t] == top_down[t][:,None]
+        activation = np.where(td[:,None], activation + np.where(vis, matches, 0.5), activation)
+        activation = np.where(searched[t], -np.inf, activation)
+        best = activation.max(axis = 1)
+        target = np.argmin(np.where(activation == best[:,None], tie_rank[s], 2*n), axis = 1)
+
+        mt[t] += emma_t[s, target]
+        moved = emma_moved[s, target]
+        lengths[t] += moved
+        searched[t, target] = True
+        found_plus = plus[t, target]
+        pluses[t] += found_plus
+        minuses[t] += ~found_plus
+
+        decided = (pluses[t] >= n/2) | (minuses[t] >= n/2)
+        decisions[t[decided]] = pluses[t[decided]] >= n/2
+        unfound = (~searched[t] & matches).sum(axis = 1)
+        exhausted = ~decided & td & (unfound == 0)
+        decisions[t[exhausted]] = top_down[t[exhausted]] == 2
+        done = decided | exhausted | searched[t].all(axis = 1)
+        undecided = done & ~decided & ~exhausted
+        decisions[t[undecided]] = np.where(pluses[t[undecided]] > minuses[t[undecided]], 1,
+                                           np.where(pluses[t[undecided]] < minuses[t[undecided]], 0, -1))
+        go = moved | bool(force_fixation)
+        start[t[go]] = target[go]
+        stale[t[go]] = True
+        active[t[done]] = False
+
+    return mt, lengths, decisions
+
 #reset_decision_ui(decision_ui, element_values2, color = True)
 #reset_decision_ui(decision_ui)
 #ui.visualise_UI(decision_ui)
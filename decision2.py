@@ -1,17 +1,84 @@
-import random
 import ui
 import numpy as np
 import math
-from operator import itemgetter
+import json
+import struct
+import statistics
+import time
+
+# Colours that can be in the visual matrix. Each element of the visual
+# matrix is encoded as seen*4 + colour code, and the state as a base-8
+# number of these, first element in the lowest digit.
+visual_colours = [None, "green", "red", "grey"]
+visual_colour_codes = {c: i for i, c in enumerate(visual_colours)}
+
+# Which colours become visible when fixating an element: entry [a, e]
+# is True when element e is close enough to fixated element a, within
+# 2.5 times its own size.
+def colour_neighbours(ui):
+    names = list(ui.elements)
+    n = len(names)
+    eyes, targets = np.meshgrid(names, names, indexing = 'ij')
+    dist = ui.element_distances(targets.ravel(), eyes.ravel()).reshape(n, n)
+    size = np.array([ui.element_size(e) for e in names], dtype = float)
+    return dist / size[None,:] < 2.5
+
+# Random numbers for one agent from its own numpy Generator. Uniforms
+# are drawn in blocks, and the integers, choices and samples are made
+# from them, so that a seed (an int or a SeedSequence) gives the same
+# stream every time, whatever else runs in the process.
+class block_random():
+
+    def __init__(self, seed = None, block = 4096):
+        self.generator = np.random.default_rng(seed)
+        self.block = block
+        self._uniforms = []
+        self._next = 0
+
+    def random(self):
+        if self._next == len(self._uniforms):
+            self._uniforms = self.generator.random(self.block).tolist()
+            self._next = 0
+        u = self._uniforms[self._next]
+        self._next += 1
+        return u
+
+    # An integer in [low, high)
+    def integers(self, low, high):
+        return low + int(self.random() * (high - low))
+
+    # An integer in [a, b], as random.randint
+    def randint(self, a, b):
+        return self.integers(a, b + 1)
+
+    def choice(self, seq):
+        return seq[self.integers(0, len(seq))]
+
+    # k distinct items of seq, as random.sample (by a partial
+    # Fisher-Yates shuffle)
+    def sample(self, seq, k):
+        pool = list(seq)
+        n = len(pool)
+        for i in range(k):
+            j = self.integers(i, n)
+            pool[i], pool[j] = pool[j], pool[i]
+        return pool[:k]
 
 class decision_task():
 
-    def __init__(self, ui, colours = True, time_cost = 1):
+    # If belief, the state is not the visual matrix but the belief
+    # state of planner.py: which colours are known, how many of them
+    # are green, and where the eyes are (see belief_code).
+    #
+    # The agent draws its random numbers from block_random(seed).
+    def __init__(self, ui, colours = True, time_cost = 1, belief = False, seed = None):
 
         self.ui = ui
+        self.rng = block_random(seed)
 
         self.colours = colours
         self.time_cost = time_cost
+        self.belief = belief
 
         self.encoding_penalty = 0
 
@@ -21,8 +88,18 @@ class decision_task():
 
         self.actions.append("accept")
         self.actions.append("reject")
+        self.action_index = {a: i for i, a in enumerate(self.actions)}
+        self.element_index = {e: i for i, e in enumerate(ui.elements)}
 
-        self.q = {}
+        # Q values, a row per state in order of discovery. states maps
+        # a state code to its row.
+        self.q = np.zeros((1024, len(self.actions)))
+        self.states = {}
+
+        # The layout is fixed during training, so the elements whose
+        # colour is seen from each fixated element are looked up.
+        self.neighbours = colour_neighbours(ui)
+        self.neighbour_lists = [[(i, e) for i, e in enumerate(ui.elements) if row[i]] for row in self.neighbours.tolist()]
 
         self.starting_loc = ui.closest_element([0,0])
 
@@ -44,11 +121,10 @@ class decision_task():
 
         self.randomise_decision_ui(colours = self.colours)
 
-        self.visual_matrix = {}
-        for e in self.ui.elements:
-            self.visual_matrix[e] = [0,None]
+        self.visual_codes = [0] * len(self.ui.elements)
+        self.state_code = 0
 
-        self.eye_loc = random.choice(list(self.ui.elements.keys()))
+        self.eye_loc = self.rng.choice(list(self.ui.elements.keys()))
         self.scanpath = [self.eye_loc]
 
         self.mt = 0
@@ -56,45 +132,87 @@ class decision_task():
         self.terminal = False
 
         self.previous_state = None
+        self.previous_row = None
         self.previous_action = None
         self.action = None
         self.set_state()
 
+    # The visual matrix as a dict of [seen, colour] by element.
+    @property
+    def visual_matrix(self):
+        return self.decode_state(self.state_code)
+
+    def decode_state(self, code):
+        matrix = {}
+        for e in self.ui.elements:
+            matrix[e] = [(code % 8) // 4, visual_colours[code % 4]]
+            code //= 8
+        return matrix
+
+    # Set element i of the visual matrix, keeping the state code up to
+    # date.
+    def see(self, i, seen, colour):
+        new = seen*4 + visual_colour_codes[colour]
+        if new != self.visual_codes[i]:
+            self.state_code += (new - self.visual_codes[i]) * 8**i
+            self.visual_codes[i] = new
+
+    # The belief state as a code: a bit per element whose colour is
+    # known, plus the number of known greens times 2^n and the index of
+    # the element the eyes are on times 4^n, for n elements.
+    def belief_code(self):
+        n = len(self.visual_codes)
+        known = 0
+        greens = 0
+        for i, v in enumerate(self.visual_codes):
+            if v % 4:
+                known += 1 << i
+                greens += v % 4 == visual_colour_codes["green"]
+        return known + (greens << n) + (self.element_index[self.eye_loc] << 2*n)
+
     def set_state(self):
-        self.current_state = repr(self.visual_matrix)
-        if self.current_state not in self.q:
-            self.q[self.current_state] = {}
-            # Add all actions as possible pairs if this new state.
-            for a in self.actions:
-                self.q[self.current_state][a] = 0.0
+        self.current_state = self.belief_code() if self.belief else self.state_code
+        if self.current_state not in self.states:
+            self.add_state(self.current_state)
+        self.current_row = self.states[self.current_state]
+
+    # Add a row of Q values for a new state, with all actions as
+    # possible pairs.
+    def add_state(self, code):
+        if len(self.states) == len(self.q):
+            self.q = np.concatenate((self.q, np.zeros(self.q.shape)))
+        self.states[code] = len(self.states)
+        return self.states[code]
 
     def update_q_learning(self):
         # Only learn if there is a previous action. If this is a start
         # of a new episode after a self.clear(), cannot learn yet.
         if self.previous_action != None:
-            previous_q = self.q[self.previous_state][self.previous_action]
-            next_q = max(self.q[self.current_state].items(), key = itemgetter(1))[1]
-            self.q[self.previous_state][self.previous_action] = \
+            a = self.action_index[self.previous_action]
+            previous_q = float(self.q[self.previous_row, a])
+            next_q = float(self.q[self.current_row].max())
+            self.q[self.previous_row, a] = \
                 previous_q + self.alpha * (self.reward + self.gamma * next_q - previous_q)
 
     def update_q_td(self):
-        previous_q = self.q[self.current_state][self.action]
-        self.q[self.current_state][self.action] = \
+        a = self.action_index[self.action]
+        previous_q = float(self.q[self.current_row, a])
+        self.q[self.current_row, a] = \
                 previous_q + self.alpha * (self.reward - previous_q)
 
 
     def choose_action_epsilon_greedy(self):
-        if random.random() < self.epsilon:
-            self.action = random.choice(self.actions)
+        if self.rng.random() < self.epsilon:
+            self.action = self.rng.choice(self.actions)
             return "randomly" # for output (debug) purposes
         else:
-            self.action = max(self.q[self.current_state].items(), key = itemgetter(1))[0]
+            self.action = self.actions[int(np.argmax(self.q[self.current_row]))]
             return "greedily"
 
     def choose_action_softmax(self, debug = False):
         p = {}
-        for a in self.q[self.current_state].keys():
-            p[a] = math.exp(self.q[self.current_state][a] / self.softmax_temp)
+        for a, q in zip(self.actions, self.q[self.current_row].tolist()):
+            p[a] = math.exp(q / self.softmax_temp)
         s = sum(p.values())
         if debug:
             print(p)
@@ -104,10 +222,10 @@ class decision_task():
                 print(p)
             self.action = self.weighted_random(p)
         else:
-            self.action = np.random.choice(list(p.keys()))
+            self.action = self.rng.choice(list(p.keys()))
 
     def weighted_random(self, weights):
-        number = random.random() * sum(weights.values())
+        number = self.rng.random() * sum(weights.values())
         for k, v in weights.items():
             if number < v:
                 break
@@ -130,11 +248,12 @@ class decision_task():
 
     def do_step(self, print_progress = False, force_action = None):
         self.previous_state = self.current_state
+        self.previous_row = self.current_row
         self.previous_action = self.action
         self.set_state()
 
         if print_progress:
-            print("Now in state:", self.current_state)
+            print("Now in state:", self.visual_matrix)
 
         if self.learning:
             self.update_q_learning()
@@ -156,13 +275,12 @@ class decision_task():
                 self.eye_loc = self.action
             self.scanpath.append(self.action)
             if self.ui.elements[self.action].data >= 0.5:
-                self.visual_matrix[self.action] = [1,"green"]
+                self.see(self.element_index[self.action], 1, "green")
             else:
-                self.visual_matrix[self.action] = [1,"red"]
+                self.see(self.element_index[self.action], 1, "red")
             if self.colours:
-                for e in self.ui.elements:
-                    if self.ui.element_distance(e,self.action)/self.ui.element_size(e) < 2.5:
-                        self.visual_matrix[e] = [self.visual_matrix[e][0],self.ui.elements[e].color]
+                for i, e in self.neighbour_lists[self.element_index[self.action]]:
+                    self.see(i, self.visual_codes[i] // 4, self.ui.elements[e].color)
         else:
             self.mt = 0.5
             self.terminal = True
@@ -179,63 +297,504 @@ class decision_task():
 
     def randomise_decision_ui(self, colours = True):
         n_elements = len(self.ui.elements)
-        correct_answer = random.randint(0,1)
+        correct_answer = self.rng.randint(0,1)
 
         for e in self.ui.elements:
             self.ui.elements[e].data = 0
 
         if correct_answer == 1:
-            greens = random.randint(round(n_elements/2)+1,n_elements-1)
+            greens = self.rng.randint(round(n_elements/2)+1,n_elements-1)
         else:
-            greens = random.randint(0,round(n_elements/2)-1)
+            greens = self.rng.randint(0,round(n_elements/2)-1)
 
-        for e in random.sample(list(self.ui.elements.keys()), greens):
+        for e in self.rng.sample(list(self.ui.elements.keys()), greens):
             if colours: self.ui.elements[e].color = "green"
             else: self.ui.elements[e].color = "grey"
-            self.ui.elements[e].data = random.randint(51,99)/100
+            self.ui.elements[e].data = self.rng.randint(51,99)/100
 
         for e in self.ui.elements:
             if self.ui.elements[e].data < 0.5:
                 if colours: self.ui.elements[e].color = "red"
                 else: self.ui.elements[e].color = "grey"
-                self.ui.elements[e].data = random.randint(1,49)/100
+                self.ui.elements[e].data = self.rng.randint(1,49)/100
 
         self.correct_answer = correct_answer
 
-m = 8
-decision_ui = ui.ui()
-decision_ui.add_element("e1", 0*m,0*m,50*m,50*m)
-decision_ui.add_element("e2", 75*m,0*m,50*m,50*m)
-decision_ui.add_element("e3", 150*m,0*m,50*m,50*m)
-
-decision_ui.add_element("e4", 0*m,75*m,50*m,50*m)
-decision_ui.add_element("e5", 75*m,75*m,50*m,50*m)
-decision_ui.add_element("e6", 150*m,75*m,50*m,50*m)
-
-decision_ui.add_element("e7", 0*m,150*m,50*m,50*m)
-decision_ui.add_element("e8", 75*m,150*m,50*m,50*m)
-decision_ui.add_element("e9", 150*m,150*m,50*m,50*m)
+# N independent copies of a decision task, run in lockstep with the
+# state of every copy held in numpy arrays. The copies share the Q table
+# (and the hyperparameters) of agent, and follow the same dynamics,
+# rewards and learning rules as decision_task.do_step. The layout of
+# agent.ui is only read, never modified.
+#
+# Q update targets in a step are computed from the Q values at the start
+# of the step. When several copies update the same state and action at
+# once, the updates are applied one after the other in copy order.
+class decision_task_batch():
+
+    def __init__(self, agent, n_envs, seed = None):
+        self.agent = agent
+        self.n_envs = n_envs
+        self.n = len(agent.ui.elements)
+        if self.n > 20:
+            raise ValueError("state codes of more than 20 elements do not fit in 64 bits")
+        self.rng = np.random.default_rng(seed)
+
+        # The layout is fixed, so the fixation times can be looked up,
+        # as can the colours that become visible (from the agent).
+        self.emma_t, self.emma_moved = agent.ui.emma_table()
+        self.neighbours = agent.neighbours
+
+        self.powers = 8 ** np.arange(self.n, dtype = np.int64)
+        self.accept = self.n
+        self.reject = self.n + 1
+        self.known_codes = np.zeros(0, dtype = np.int64)
+        self.known_rows = np.zeros(0, dtype = int)
+
+        N = n_envs
+        self.correct_answer = np.zeros(N, dtype = int)
+        self.green = np.zeros((N, self.n), dtype = bool)
+        self.codes = np.zeros((N, self.n), dtype = np.int64)
+        self.eye_loc = np.zeros(N, dtype = int)
+        self.fixations = np.zeros(N, dtype = int)
+        self.task_time = np.zeros(N)
+        self.reward = np.zeros(N)
+        self.terminal = np.zeros(N, dtype = bool)
+        self.action = np.full(N, -1)
+        self.current_row = np.zeros(N, dtype = int)
+        self.clear()
 
-def train_decision_maker(ui, colours = True, time_cost = 1, incorrect_reward = 0, encoding_penalty = 0, episodes = 800000):
+    # Start new episodes in the copies given by mask (all by default),
+    # as decision_task.clear does.
+    def clear(self, mask = None):
+        if mask is None:
+            mask = np.ones(self.n_envs, dtype = bool)
+        idx = np.flatnonzero(mask)
+        k = len(idx)
+        n = self.n
+        correct = self.rng.integers(0, 2, size = k)
+        greens = np.where(correct == 1,
+                          self.rng.integers(round(n/2)+1, n, size = k),
+                          self.rng.integers(0, round(n/2), size = k))
+        # A random subset of size greens: the elements whose random
+        # key is among the greens smallest.
+        ranks = np.argsort(np.argsort(self.rng.random((k, n)), axis = 1), axis = 1)
+        self.correct_answer[idx] = correct
+        self.green[idx] = ranks < greens[:,None]
+        self.codes[idx] = 0
+        self.eye_loc[idx] = self.rng.integers(0, n, size = k)
+        self.fixations[idx] = 1
+        self.task_time[idx] = 0
+        self.reward[idx] = 0
+        self.terminal[idx] = False
+        self.action[idx] = -1
+        self.current_row[idx] = self.rows(self.state_codes(idx))
+
+    # The state codes of the copies idx (all by default), as
+    # decision_task.set_state.
+    def state_codes(self, idx = slice(None)):
+        codes = self.codes[idx]
+        if not self.agent.belief:
+            return codes @ self.powers
+        colour = codes % 4
+        n = self.n
+        known = (colour != 0) @ (1 << np.arange(n, dtype = np.int64))
+        greens = (colour == visual_colour_codes["green"]).sum(axis = 1)
+        return known + (greens << n) + (self.eye_loc[idx].astype(np.int64) << 2*n)
+
+    # Return the Q table rows of the given state codes, adding new
+    # states to the agent.
+    def rows(self, codes):
+        if len(self.known_codes):
+            pos = np.minimum(np.searchsorted(self.known_codes, codes), len(self.known_codes) - 1)
+            found = self.known_codes[pos] == codes
+        else:
+            found = np.zeros(len(codes), dtype = bool)
+        if not found.all():
+            new = np.unique(codes[~found])
+            new_rows = [self.agent.states[c] if c in self.agent.states else self.agent.add_state(c) for c in new.tolist()]
+            at = np.searchsorted(self.known_codes, new)
+            self.known_codes = np.insert(self.known_codes, at, new)
+            self.known_rows = np.insert(self.known_rows, at, new_rows)
+            pos = np.searchsorted(self.known_codes, codes)
+        return self.known_rows[pos]
+
+    # Move the Q values of rows r and actions a towards targets. k
+    # updates of the same entry in a row give
+    # (1-alpha)^k q + sum_j alpha (1-alpha)^(k-1-j) target_j.
+    def update(self, r, a, targets):
+        if len(r) == 0:
+            return
+        q = self.agent.q
+        alpha = self.agent.alpha
+        keys = r * q.shape[1] + a
+        order = np.argsort(keys, kind = 'stable')
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        counts = np.diff(np.r_[starts, len(keys)])
+        group = np.repeat(np.arange(len(starts)), counts)
+        after = counts[group] - 1 - (np.arange(len(keys)) - starts[group])
+        sums = np.zeros(len(starts))
+        np.add.at(sums, group, alpha * (1 - alpha) ** after * targets[order])
+        rows, actions = np.divmod(keys[starts], q.shape[1])
+        q[rows, actions] = (1 - alpha) ** counts * q[rows, actions] + sums
+
+    # Take one step in every copy. Returns the mask of copies whose
+    # episode ended; they are left as they are until cleared.
+    def step(self):
+        agent = self.agent
+        N = self.n_envs
+        all_envs = np.arange(N)
+        previous_row = self.current_row
+        previous_action = self.action
+        self.current_row = self.rows(self.state_codes())
+        q = agent.q
+
+        if agent.learning:
+            learn = previous_action >= 0
+            r, a = previous_row[learn], previous_action[learn]
+            next_q = q[self.current_row[learn]].max(axis = 1)
+            self.update(r, a, self.reward[learn] + agent.gamma * next_q)
+
+        greedy = np.argmax(q[self.current_row], axis = 1)
+        explore = self.rng.random(N) < agent.epsilon
+        self.action = np.where(explore, self.rng.integers(0, len(agent.actions), size = N), greedy)
+
+        fixate = self.action < self.n
+        f = all_envs[fixate]
+        a = self.action[fixate]
+        mt = np.full(N, 0.5)
+        mt[f] = self.emma_t[self.eye_loc[f], a] + agent.encoding_penalty
+        moved = self.emma_moved[self.eye_loc[f], a]
+        self.eye_loc[f[moved]] = a[moved]
+        self.fixations[f] += 1
+        # Seen colours come from the data, green if >= 0.5, and
+        # peripheral ones from the element colours, which match them.
+        colour = np.where(self.green[f], 1, 2)
+        self.codes[f, a] = 4 + colour[np.arange(len(f)), a]
+        if agent.colours:
+            codes = self.codes[f]
+            self.codes[f] = np.where(self.neighbours[a], codes // 4 * 4 + colour, codes)
+        self.terminal = ~fixate
+
+        self.task_time += mt
+
+        # As in calculate_reward
+        self.reward = np.zeros(N)
+        decided = self.terminal
+        right = np.where(self.action == self.accept, self.correct_answer == 1, self.correct_answer == 0)
+        self.reward[decided] = np.where(right[decided], agent.correct_reward, agent.incorrect_reward) - self.task_time[decided]*agent.time_cost
+
+        if agent.learning and decided.any():
+            r, a = self.current_row[decided], self.action[decided]
+            self.update(r, a, self.reward[decided])
+
+        return self.terminal.copy()
+
+# The 3x3 decision layout. decision_ui, shared by everything that uses
+# it, is built on first use.
+def make_decision_ui():
+    m = 8
+    layout = ui.ui()
+    layout.add_element("e1", 0*m,0*m,50*m,50*m)
+    layout.add_element("e2", 75*m,0*m,50*m,50*m)
+    layout.add_element("e3", 150*m,0*m,50*m,50*m)
+
+    layout.add_element("e4", 0*m,75*m,50*m,50*m)
+    layout.add_element("e5", 75*m,75*m,50*m,50*m)
+    layout.add_element("e6", 150*m,75*m,50*m,50*m)
+
+    layout.add_element("e7", 0*m,150*m,50*m,50*m)
+    layout.add_element("e8", 75*m,150*m,50*m,50*m)
+    layout.add_element("e9", 150*m,150*m,50*m,50*m)
+    return layout
+
+def get_decision_ui():
+    if "decision_ui" not in globals():
+        globals()["decision_ui"] = make_decision_ui()
+    return globals()["decision_ui"]
+
+def __getattr__(name):
+    if name == "decision_ui":
+        return get_decision_ui()
+    raise AttributeError("module 'decision2' has no attribute '" + name + "'")
+
+# Early stopping for train_decision_maker. Every window episodes the
+# mean reward of the window is compared to the best so far, and the Q
+# table to the one at the end of the previous window (mean absolute
+# change per entry, new states counting from zero). When the reward
+# improves by less than tolerance and the Q table changes by less than
+# q_tolerance for patience windows in a row, training should stop.
+class convergence_monitor():
+
+    def __init__(self, agent, window = 10000, tolerance = 0.1, q_tolerance = None, patience = 3):
+        self.agent = agent
+        self.window = window
+        self.tolerance = tolerance
+        self.q_tolerance = tolerance if q_tolerance is None else q_tolerance
+        self.patience = patience
+        self.best = -math.inf
+        self.flat = 0
+        self.reward_sum = 0
+        self.count = 0
+        self.q = agent.q[:len(agent.states)].copy()
+        self.history = [] # (episode, window mean reward, Q delta)
+        self.stopped_at = None
+
+    # Add the reward of the given (1-based) episode. Returns True when
+    # training should stop.
+    def add(self, reward, episode):
+        self.reward_sum += reward
+        self.count += 1
+        if self.count < self.window:
+            return False
+        mean = self.reward_sum / self.count
+        self.reward_sum = 0
+        self.count = 0
+
+        q = self.agent.q[:len(self.agent.states)]
+        old = len(self.q)
+        change = np.abs(q[:old] - self.q).sum() + np.abs(q[old:]).sum()
+        delta = float(change) / max(q.size, 1)
+        self.q = q.copy()
+
+        improvement = mean - self.best
+        self.best = max(self.best, mean)
+        self.history.append((episode, mean, delta))
+        if improvement < self.tolerance and delta < self.q_tolerance:
+            self.flat += 1
+        else:
+            self.flat = 0
+        if self.flat >= self.patience:
+            self.stopped_at = episode
+            return True
+        return False
+
+# Running mean and variance (Welford's algorithm) in constant memory.
+class running_stats():
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x):
+        self.n += 1
+        d = x - self.mean
+        self.mean += d / self.n
+        self.m2 += d * (x - self.mean)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+# Streaming telemetry of training: running statistics of episode reward
+# and length (steps, the fixations plus the decision) over the whole
+# run and since the last report, the states discovered, and the
+# throughput. Every interval episodes each callback is called with the
+# metrics, after which the recent statistics start over.
+class training_metrics():
+
+    def __init__(self, agent, callbacks = (), interval = 10000):
+        self.agent = agent
+        self.callbacks = list(callbacks)
+        self.interval = interval
+        self.episodes = 0
+        self.steps = 0
+        self.reward = running_stats()
+        self.length = running_stats()
+        self.recent_reward = running_stats()
+        self.recent_length = running_stats()
+        self.start = time.perf_counter()
+
+    @property
+    def states(self):
+        return len(self.agent.states)
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.start
+
+    @property
+    def episodes_per_second(self):
+        return self.episodes / max(self.seconds, 1e-9)
+
+    @property
+    def steps_per_second(self):
+        return self.steps / max(self.seconds, 1e-9)
+
+    def add(self, reward, length):
+        self.episodes += 1
+        self.steps += length
+        self.reward.add(reward)
+        self.length.add(length)
+        self.recent_reward.add(reward)
+        self.recent_length.add(length)
+        if self.callbacks and self.episodes % self.interval == 0:
+            for callback in self.callbacks:
+                callback(self)
+            self.recent_reward = running_stats()
+            self.recent_length = running_stats()
+
+    # The current metrics as a dict, e.g. for logging.
+    def snapshot(self):
+        return {
+            "episodes": self.episodes,
+            "steps": self.steps,
+            "seconds": self.seconds,
+            "episodes_per_second": self.episodes_per_second,
+            "steps_per_second": self.steps_per_second,
+            "states": self.states,
+            "reward_mean": self.reward.mean,
+            "reward_var": self.reward.variance,
+            "length_mean": self.length.mean,
+            "length_var": self.length.variance,
+            "recent_reward_mean": self.recent_reward.mean,
+            "recent_reward_var": self.recent_reward.variance,
+            "recent_length_mean": self.recent_length.mean,
+            "recent_length_var": self.recent_length.variance
+            }
+
+# A training_metrics callback that prints a line of the snapshot.
+def print_metrics(metrics):
+    print(metrics.episodes, "episodes,",
+          round(metrics.recent_reward.mean, 2), "+-", round(math.sqrt(metrics.recent_reward.variance), 2), "reward,",
+          round(metrics.recent_length.mean, 2), "steps,",
+          metrics.states, "states,",
+          round(metrics.episodes_per_second), "episodes/s,",
+          round(metrics.steps_per_second), "steps/s")
+
+# The agent's random numbers come from seed; with the same seed, training
+# gives the same Q table every time. If n_envs is given, that many copies
+# of the task are trained in lockstep with decision_task_batch, which
+# gets an independent stream from the same seed.
+#
+# If tolerance is given, training stops early once it has converged,
+# as checked by convergence_monitor with the given window, tolerance,
+# q_tolerance and patience. The number of episodes trained is left in
+# agent.episodes_trained and the monitor in agent.convergence.
+#
+# Telemetry is kept in agent.metrics (training_metrics), which calls
+# callbacks every interval episodes.
+#
+# If belief, the agent learns over the belief states of planner.py.
+def train_decision_maker(ui, colours = True, time_cost = 1, incorrect_reward = 0, encoding_penalty = 0, episodes = 800000, n_envs = None, seed = None,
+                         tolerance = None, q_tolerance = None, patience = 3, window = 10000, callbacks = (), interval = 10000, belief = False):
     print("Starting training...")
-    agent = decision_task(ui, colours, time_cost)
+    agent_seed, batch_seed = np.random.SeedSequence(seed).spawn(2)
+    agent = decision_task(ui, colours, time_cost, belief, seed = agent_seed)
     agent.encoding_penalty = encoding_penalty
     agent.incorrect_reward = incorrect_reward
-    i = 0
+    monitor = None
+    if tolerance is not None:
+        monitor = convergence_monitor(agent, window, tolerance, q_tolerance, patience)
+    agent.convergence = monitor
+    metrics = training_metrics(agent, callbacks, interval)
+    agent.metrics = metrics
     until = episodes
-    rewards = []
-    while i < until:
-        agent.do_step()
-        if agent.terminal:
-            rewards.append(agent.reward)
-            agent.clear()
-            i+=1
-            if i%round(until/10)==0:
-                print(round(i/until,1),round(np.mean(rewards),1))
-                rewards = []
+    tenth = running_stats()
+
+    # Book an ended episode. Returns True when training should stop.
+    def finish(reward, length):
+        nonlocal tenth
+        metrics.add(reward, length)
+        tenth.add(reward)
+        i = metrics.episodes
+        if i%max(1, round(until/10))==0:
+            print(round(i/until,1),round(tenth.mean,1))
+            tenth = running_stats()
+        return monitor is not None and monitor.add(reward, i)
+
+    stop = False
+    if n_envs:
+        envs = decision_task_batch(agent, n_envs, seed = batch_seed)
+        while metrics.episodes < until and not stop:
+            done = envs.step()
+            left = until - metrics.episodes
+            for reward, length in zip(envs.reward[done][:left].tolist(), envs.fixations[done][:left].tolist()):
+                if finish(reward, length):
+                    stop = True
+                    break
+            envs.clear(done)
+    else:
+        while metrics.episodes < until and not stop:
+            agent.do_step()
+            if agent.terminal:
+                stop = finish(agent.reward, len(agent.scanpath))
+                agent.clear()
+    agent.episodes_trained = metrics.episodes
+    if stop:
+        print("Converged, stopped at episode", metrics.episodes)
     print("Training finished.")
     return agent
 
+# Agent files: the magic, the length of a JSON header of the actions
+# and hyperparameters, the header, padding to a multiple of 64 bytes,
+# then the state codes (int64) in row order and the Q table (float64),
+# a row per state.
+agent_file_magic = b"DQA1"
+agent_hyperparameters = ["colours", "belief", "time_cost", "encoding_penalty", "correct_reward", "incorrect_reward",
+                         "alpha", "epsilon", "gamma", "softmax_temp"]
+
+def save_agent(agent, path):
+    n_states = len(agent.states)
+    codes = np.zeros(n_states, dtype = "<i8")
+    for code, row in agent.states.items():
+        codes[row] = code
+    header = {"actions": agent.actions, "n_states": n_states}
+    for h in agent_hyperparameters:
+        header[h] = getattr(agent, h)
+    header = json.dumps(header).encode()
+    start = len(agent_file_magic) + 4 + len(header)
+    padding = -start % 64
+    with open(path, "wb") as f:
+        f.write(agent_file_magic)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        f.write(bytes(padding))
+        f.write(codes.tobytes())
+        f.write(np.ascontiguousarray(agent.q[:n_states], dtype = "<f8").tobytes())
+
+# Load an agent saved with save_agent to run on ui, which must have
+# the same elements. The Q table is memory-mapped with mmap_mode as in
+# np.memmap; with the default "r" it is read-only and shared between
+# processes that load the same file, so learning is switched off.
+# Use "c" to learn on a private copy, or None to read it into memory.
+# The loaded agent draws its random numbers from seed.
+def load_agent(path, ui = None, mmap_mode = "r", seed = None):
+    if ui is None:
+        ui = get_decision_ui()
+    with open(path, "rb") as f:
+        if f.read(len(agent_file_magic)) != agent_file_magic:
+            raise ValueError("not a decision agent file: " + str(path))
+        length, = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length).decode())
+    start = len(agent_file_magic) + 4 + length
+    start += -start % 64
+    if header["actions"] != list(ui.elements) + ["accept", "reject"]:
+        raise ValueError("the agent was trained on a different set of elements")
+
+    agent = decision_task(ui, header["colours"], header["time_cost"], header["belief"], seed = seed)
+    for h in agent_hyperparameters:
+        setattr(agent, h, header[h])
+    n_states = header["n_states"]
+    n_actions = len(header["actions"])
+    if n_states == 0:
+        agent.clear()
+        return agent
+    if mmap_mode is None:
+        with open(path, "rb") as f:
+            f.seek(start)
+            codes = np.frombuffer(f.read(8 * n_states), dtype = "<i8")
+            agent.q = np.frombuffer(f.read(8 * n_states * n_actions), dtype = "<f8").reshape(n_states, n_actions).copy()
+    else:
+        codes = np.memmap(path, dtype = "<i8", mode = "r", offset = start, shape = (n_states,))
+        agent.q = np.memmap(path, dtype = "<f8", mode = mmap_mode, offset = start + 8 * n_states, shape = (n_states, n_actions))
+        if mmap_mode == "r":
+            agent.learning = False
+    agent.states = dict(zip(codes.tolist(), range(n_states)))
+    agent.clear()
+    return agent
+
 def simulate_decision_task(agent, element_values = None):
     agent.epsilon = 0
     agent.learning = False
@@ -304,6 +863,55 @@ def sample_decision_agent(agent, n = 1000):
     return np.mean(correct_answers), round(np.mean(task_times),1), round(np.mean(fixations),1)
 
 
+# As sample_decision_agent, but with n_envs episodes rolled out at once
+# by decision_task_batch, seeded with seed. Episodes that do not end
+# within max_steps steps are counted as stuck and left out. As in
+# sample_decision_agent, task time and fixations are averaged over the
+# correctly decided episodes only. Returns a dict of the means, their
+# confidence intervals (normal approximation) and the counts.
+def evaluate_decision_agent(agent, n = 1000, n_envs = 1000, seed = None, max_steps = 100, confidence = 0.95):
+    agent.epsilon = 0
+    agent.learning = False
+    n_envs = max(1, min(n_envs, n))
+    envs = decision_task_batch(agent, n_envs, seed = seed)
+    active = np.ones(n_envs, dtype = bool)
+    steps = np.zeros(n_envs, dtype = int)
+    started = n_envs
+    correct = []
+    task_times = []
+    fixations = []
+    stuck = 0
+
+    while active.any():
+        done = envs.step() & active
+        steps += 1
+        gave_up = ~done & active & (steps >= max_steps)
+        stuck += int(gave_up.sum())
+        right = np.where(envs.action == envs.accept, envs.correct_answer == 1, envs.correct_answer == 0)
+        correct.extend(right[done].tolist())
+        task_times.extend(envs.task_time[done & right].tolist())
+        fixations.extend(envs.fixations[done & right].tolist())
+
+        # Start new episodes until n have been started
+        ended = np.flatnonzero(done | gave_up)
+        restart = ended[:max(0, n - started)]
+        started += len(restart)
+        active[ended[len(restart):]] = False
+        mask = np.zeros(n_envs, dtype = bool)
+        mask[restart] = True
+        envs.clear(mask)
+        steps[restart] = 0
+
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    results = {"n": n, "stuck": stuck, "decided": len(correct), "correct": int(np.sum(correct))}
+    for name, values in (("accuracy", correct), ("task_time", task_times), ("fixations", fixations)):
+        values = np.asarray(values, dtype = float)
+        mean = float(values.mean()) if len(values) else float("nan")
+        half = z * float(values.std(ddof = 1)) / math.sqrt(len(values)) if len(values) > 1 else float("nan")
+        results[name] = mean
+        results[name + "_ci"] = (mean - half, mean + half)
+    return results
+
 # agent = train_decision_maker(decision_ui, colours = False)
 # agent_col = train_decision_maker(decision_ui, colours = True)
 
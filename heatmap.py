@@ -0,0 +1,104 @@
+# Aggregate many scanpaths on one layout into fixation counts, dwell
+# times, saccade transitions and a screen heatmap, without keeping the
+# scanpaths.
+
+import numpy as np
+
+class scanpath_aggregator():
+
+    def __init__(self, ui):
+        self.ui = ui
+        self.names = list(ui.elements)
+        self.n = len(self.names)
+        self.scanpaths = 0
+        self.counts = np.zeros(self.n, dtype = np.int64) # fixations per element
+        self.dwell = np.zeros(self.n) # EMMA time of the fixations on each element
+        self.transitions = np.zeros((self.n, self.n), dtype = np.int64) # saccades from row to column
+
+    # Add scanpaths, each a list of element names or a row of element
+    # indices padded with -1 (as from montecarlo.run_searches). The
+    # dwell time of a fixation is the EMMA time of moving the eyes to
+    # it from the previous one; the first fixation has none.
+    def add(self, scanpaths):
+        index = self.ui.store.index
+        froms = []
+        tos = []
+        for s in scanpaths:
+            if isinstance(s, np.ndarray):
+                r = s[s >= 0].astype(int)
+            else:
+                r = np.array([index[e] for e in s], dtype = int)
+            if len(r) == 0:
+                continue
+            self.scanpaths += 1
+            np.add.at(self.counts, r, 1)
+            froms.append(r[:-1])
+            tos.append(r[1:])
+        if not froms:
+            return
+        froms = np.concatenate(froms)
+        tos = np.concatenate(tos)
+        if len(froms):
+            t, moved = self.ui.emma_times([self.names[i] for i in tos.tolist()], [self.names[i] for i in froms.tolist()])
+            np.add.at(self.dwell, tos, t)
+            np.add.at(self.transitions, (froms, tos), 1)
+
+    # Add the counts of another aggregator of the same layout, e.g. one
+    # filled in a worker process.
+    def merge(self, other):
+        self.scanpaths += other.scanpaths
+        self.counts += other.counts
+        self.dwell += other.dwell
+        self.transitions += other.transitions
+
+    # Fixations (or dwell time, if dwell) per element, as a dict by name.
+    def histogram(self, dwell = False):
+        values = self.dwell if dwell else self.counts
+        return dict(zip(self.names, values.tolist()))
+
+    # The transition matrix, rows from and columns to, in element order.
+    # If normalise, each row is the probability of the next fixation.
+    def transition_matrix(self, normalise = False):
+        if not normalise:
+            return self.transitions.copy()
+        totals = self.transitions.sum(axis = 1, keepdims = True)
+        return np.divide(self.transitions, totals, out = np.zeros(self.transitions.shape), where = totals > 0)
+
+    # A raster of the screen, cell pixels per cell, with the fixations
+    # (or dwell time) spread around the element centres by a Gaussian
+    # of standard deviation sigma pixels (the fixation circle radius of
+    # visualise_UI by default). Rows are y.
+    def heatmap(self, cell = 10, sigma = None, dwell = False):
+        st = self.ui.store
+        if sigma is None:
+            sigma = max(float((st.x + st.x_size).max()), float((st.y + st.y_size).max())) / 20
+        width = int(np.ceil(max(self.ui.x_size, 1) / cell))
+        height = int(np.ceil(max(self.ui.y_size, 1) / cell))
+        grid = np.zeros((height, width))
+        cx = np.clip((np.round(st.x + st.x_size/2) / cell).astype(int), 0, width - 1)
+        cy = np.clip((np.round(st.y + st.y_size/2) / cell).astype(int), 0, height - 1)
+        np.add.at(grid, (cy, cx), self.dwell if dwell else self.counts)
+        if sigma > 0:
+            s = sigma / cell
+            k = np.arange(-int(np.ceil(3*s)), int(np.ceil(3*s)) + 1)
+            kernel = np.exp(-0.5 * (k / s)**2)
+            kernel /= kernel.sum()
+            # Pad by the kernel half-width so the kernel may be longer
+            # than a row or column; 'valid' then crops back to the grid.
+            r = len(k) // 2
+            grid = np.pad(grid, r)
+            grid = np.apply_along_axis(np.convolve, 1, grid, kernel, mode = 'valid')
+            grid = np.apply_along_axis(np.convolve, 0, grid, kernel, mode = 'valid')
+        return grid
+
+    # Write the heatmap over the layout to path (png, svg...).
+    def save_heatmap(self, path, cell = 10, sigma = None, dwell = False, cmap = "hot", alpha = 0.6, width = 6, dpi = 100):
+        import render
+        fig, ax = render.layout_figure(self.ui, width, dpi)
+        render.draw_elements(ax, self.ui)
+        grid = self.heatmap(cell, sigma, dwell)
+        ax.imshow(grid, extent = (0, grid.shape[1]*cell, grid.shape[0]*cell, 0), cmap = cmap, alpha = alpha)
+        ax.set_xlim(0, max(self.ui.x_size, 1))
+        ax.set_ylim(max(self.ui.y_size, 1), 0)
+        fig.savefig(path)
+        return path
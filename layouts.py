@@ -0,0 +1,171 @@
+# Example layouts. ui.test_ui, ui.big_ui, ui.disj_small and
+# ui.disj_large load this module on first use.
+
+import ui
+
+# Test
+test_ui = ui.ui()
+
+test_ui.add_element("logo", 10, 10, 10, 10, color = "grey")
+test_ui.add_element("logo2", 20, 20, 10, 10, color = "yellow")
+test_ui.add_element("search", 100, 10, 100, 10, color = "blue")
+test_ui.add_element("button", 500, 300, 25, 20, color = "green")
+test_ui.add_element("search", 1000, 1000, 100, 100, color = "blue")
+test_ui.add_element("e1", 50, 300, 25, 20, color = "green")
+test_ui.add_element("e2", 60, 700, 25, 20, color = "green")
+
+
+test_ui.fitts_movement_time(["logo","search","button"])
+
+# test_ui.get_task_coordinates(["logo","search"])
+
+big_ui = ui.ui(1920, 1280)
+m=8
+big_ui = ui.ui(1920, 1280)
+big_ui.add_element("e1", 10*m,30*m,30*m,20*m, color ="red")
+big_ui.add_element("a2", 10*m,60*m,30*m,20*m, color ="red")
+big_ui.add_element("a3", 10*m,90*m,30*m,20*m, color ="red")
+big_ui.add_element("a4", 10*m,120*m,30*m,20*m, color ="red")
+
+big_ui.add_element("b1", 80*m,30*m,30*m,20*m, color ="green")
+big_ui.add_element("b2", 80*m,60*m,30*m,20*m, color ="green")
+big_ui.add_element("b3", 80*m,90*m,30*m,20*m, color ="green")
+big_ui.add_element("b4", 80*m,120*m,30*m,20*m, color ="green")
+
+big_ui.add_element("e2", 150*m,30*m,30*m,20*m, color ="blue")
+big_ui.add_element("c2", 150*m,60*m,30*m,20*m, color ="blue")
+big_ui.add_element("c3", 150*m,90*m,30*m,20*m, color ="blue")
+big_ui.add_element("c4", 150*m,120*m,30*m,20*m, color ="blue")
+
+big_ui.add_element("d1", 230*m,30*m,30*m,20*m, color ="grey")
+big_ui.add_element("d2", 230*m,60*m,30*m,20*m, color ="grey")
+big_ui.add_element("d3", 230*m,90*m,30*m,20*m, color ="grey")
+big_ui.add_element("d4", 230*m,120*m,30*m,20*m, color ="black")
+
+big_ui.add_element("t1", 130*m,0*m,30*m,20*m, color ="yellow")
+big_ui.add_element("t2", 170*m,0*m,30*m,20*m, color ="yellow")
+big_ui.add_element("t3", 210*m,0*m,30*m,20*m, color ="yellow")
+big_ui.add_element("e3", 250*m,0*m,30*m,20*m, color ="yellow")
+
+#big_ui.learn_element_pos("a4", "expert")
+# big_ui.learn_all_elements("expert")
+
+# #visualise_exhaustive_guided_search(big_ui, target = "d4")
+# big_ui.swap_elements("c4","d4")
+# visualise_exhaustive_guided_search(big_ui, target = "d4")
+
+# colorbad_ui = ui.ui(1920, 1280)
+# colorbad_ui.add_element("a1", 10*m,30*m,30*m,20*m, color ="red")
+# colorbad_ui.add_element("a2", 10*m,60*m,30*m,20*m, color ="green")
+# colorbad_ui.add_element("a3", 10*m,90*m,30*m,20*m, color ="blue")
+# colorbad_ui.add_element("a4", 10*m,120*m,30*m,20*m, color ="grey")
+
+# colorbad_ui.add_element("b1", 80*m,30*m,30*m,20*m, color ="green")
+# colorbad_ui.add_element("b2", 80*m,60*m,30*m,20*m, color ="grey")
+# colorbad_ui.add_element("b3", 80*m,90*m,30*m,20*m, color ="red")
+# colorbad_ui.add_element("b4", 80*m,120*m,30*m,20*m, color ="blue")
+
+# colorbad_ui.add_element("c1", 150*m,30*m,30*m,20*m, color ="blue")
+# colorbad_ui.add_element("c2", 150*m,60*m,30*m,20*m, color ="grey")
+# colorbad_ui.add_element("c3", 150*m,90*m,30*m,20*m, color ="red")
+# colorbad_ui.add_element("c4", 150*m,120*m,30*m,20*m, color ="green")
+
+# colorbad_ui.add_element("d1", 230*m,30*m,30*m,20*m, color ="blue")
+# colorbad_ui.add_element("d2", 230*m,60*m,30*m,20*m, color ="grey")
+# colorbad_ui.add_element("d3", 230*m,90*m,30*m,20*m, color ="red")
+# colorbad_ui.add_element("d4", 230*m,120*m,30*m,20*m, color ="green")
+
+# colorbad_ui.add_element("t1", 130*m,0*m,30*m,20*m, color ="red")
+# colorbad_ui.add_element("t2", 170*m,0*m,30*m,20*m, color ="blue")
+# colorbad_ui.add_element("t3", 210*m,0*m,30*m,20*m, color ="grey")
+# colorbad_ui.add_element("t4", 250*m,0*m,30*m,20*m, color ="green")
+
+# res = []
+# for i in range(1000):
+#     start = random.choice(list(color_ui.elements.keys()))
+#     start = "t1"
+#     # target = random.choice(list(color_ui.elements.keys()))
+#     # target = "c4"
+#     # color = color_ui.elements[target].color
+#     res.append(color_ui.exhaustive_guided_visual_search(start = start)[0])
+# print(np.mean(res))
+
+# res = []
+# for i in range(1000):
+#     start = random.choice(list(colorbad_ui.elements.keys()))
+#     start = "t1"
+#     # target = random.choice(list(colorbad_ui.elements.keys()))
+#     # target = "c4"
+#     # color = colorbad_ui.elements[target].color
+#     res.append(colorbad_ui.exhaustive_guided_visual_search(start = start)[0])
+# print(np.mean(res))
+
+# target = "t4"
+#visualise_exhaustive_guided_search(color_ui, start = "t1")
+#visualise_exhaustive_guided_search(colorbad_ui, start = "t1")
+
+# print(color_ui.exhaustive_guided_visual_search(start = "t2"))
+# print(colorbad_ui.exhaustive_guided_visual_search(start = "t2"))
+
+# Define disjunctive small and large layouts
+disj_small = ui.ui(1900,1280)
+m_size = 12
+m_pos = 10
+alt_color = "blue"
+disj_small.add_element("e1", 20*m_pos, 20*m_pos, 20*m_size, 20*m_size, color = alt_color)
+disj_small.add_element("e2", 40*m_pos, 80*m_pos, 20*m_size, 20*m_size, color = alt_color)
+disj_small.add_element("e3", 10*m_pos, 120*m_pos, 20*m_size, 20*m_size, color = alt_color)
+disj_small.add_element("e4", 70*m_pos, 120*m_pos, 20*m_size, 20*m_size, color = "blue")
+disj_small.add_element("e5", 100*m_pos, 50*m_pos, 20*m_size, 20*m_size, color = alt_color)
+disj_small.add_element("e6", 75*m_pos, 80*m_pos, 20*m_size, 20*m_size, color = "blue")
+disj_small.add_element("e7", 70*m_pos, 20*m_pos, 20*m_size, 20*m_size, color = "blue")
+disj_small.add_element("e8", 110*m_pos, 90*m_pos, 20*m_size, 20*m_size, color = "red")
+disj_small.eye_loc = "e7"
+
+disj_large = ui.ui(1900, 1280)
+m_size = 12
+m_pos = 10
+alt_color = "blue"
+alt_color2 = "blue"
+disj_large.add_element("e1", 20*m_pos, 20*m_pos, 20*m_size, 20*m_size, color = alt_color)
+disj_large.add_element("e2", 40*m_pos, 90*m_pos, 20*m_size, 20*m_size, color = alt_color)
+disj_large.add_element("e3", 10*m_pos, 120*m_pos, 20*m_size, 20*m_size, color = "blue")
+disj_large.add_element("e4", 70*m_pos, 120*m_pos, 20*m_size, 20*m_size, color = alt_color)
+disj_large.add_element("e5", 70*m_pos, 20*m_pos, 20*m_size, 20*m_size, color = alt_color2)
+disj_large.add_element("e6", 100*m_pos, 100*m_pos, 20*m_size, 20*m_size, color = alt_color)
+disj_large.add_element("e7", 80*m_pos, 50*m_pos, 20*m_size, 20*m_size, color = "blue")
+disj_large.add_element("e8", 120*m_pos, 130*m_pos, 20*m_size, 20*m_size, color = "red")
+disj_large.add_element("e9", 75*m_pos, 80*m_pos, 20*m_size, 20*m_size, color = "blue")
+disj_large.add_element("e10", 50*m_pos, 160*m_pos, 20*m_size, 20*m_size, color = "blue")
+disj_large.add_element("e11", 110*m_pos, 160*m_pos, 20*m_size, 20*m_size, color = alt_color)
+disj_large.add_element("e12", 140*m_pos, 100*m_pos, 20*m_size, 20*m_size, color = "blue")
+disj_large.add_element("e13", 170*m_pos, 120*m_pos, 20*m_size, 20*m_size, color = alt_color)
+disj_large.add_element("e14", 30*m_pos, 60*m_pos, 20*m_size, 20*m_size, color = alt_color2)
+disj_large.add_element("e15", 120*m_pos, 50*m_pos, 20*m_size, 20*m_size, color = alt_color2)
+disj_large.add_element("e16", 120*m_pos, 20*m_pos, 20*m_size, 20*m_size, color = alt_color)
+disj_large.eye_loc = "e7"
+
+
+# visualise_UI(disj_large)
+
+# visualise_exhaustive_guided_search(disj_large, start = "e7", target = "e8", top_down = "red")
+
+# disj_small.modify_element("e2", "color", "red")
+# visualise_exhaustive_guided_search(disj_small, start = "e7", target = "e8", top_down = "red")
+
+# my_ui = ui.ui()
+# my_ui.add_element("e1", 10, 10, 10, 10)
+# my_ui.add_element("e2", 210, 10, 10, 10)
+# my_ui.emma_time("e1", "e2")
+# visualise_exhaustive_search(my_ui)
+# my_ui.add_element("e3", 120, 100, 40, 40)
+# visualise_exhaustive_search(my_ui)
+
+# s = 0
+# for i in range(1,20):
+#     s+=math.pow(i*60+2*3600,-0.5)
+
+#s = math.pow(60,-0.5)+math.pow(120,-0.5)
+
+# test_ui.learn_element_color("button", 5)
+# visualise_exhaustive_guided_search(test_ui, target = "button")
@@ -0,0 +1,78 @@
+# Run many visual searches on one layout in parallel, e.g. to estimate
+# mean search times over random start and target pairs.
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# The layout searched by a worker process, set once per worker.
+_layout = None
+
+def _init_worker(layout):
+    global _layout
+    _layout = layout
+
+def _run_chunk(specs, guided, scanpaths):
+    times = np.zeros(len(specs))
+    fixations = np.zeros(len(specs), dtype = int)
+    paths = []
+    for i, spec in enumerate(specs):
+        start, target = spec[0], spec[1]
+        top_down = spec[2] if len(spec) > 2 else None
+        if guided:
+            mt, path = _layout.exhaustive_guided_visual_search(start = start, target = target, top_down = top_down)
+        else:
+            mt, path = _layout.exhaustive_visual_search(start = start, target = target)
+        times[i] = mt
+        fixations[i] = len(path)
+        if scanpaths:
+            paths.append([_layout.store.index[e] for e in path])
+    return times, fixations, paths
+
+# Return n random (start, target, top_down) specs for layout. If
+# top_down is True, the colour of the target is used as the top-down
+# feature, otherwise there is none.
+def random_search_specs(layout, n, top_down = False, seed = None):
+    rng = np.random.default_rng(seed)
+    names = list(layout.elements.keys())
+    starts = rng.integers(len(names), size = n)
+    targets = rng.integers(len(names), size = n)
+    specs = []
+    for s, t in zip(starts.tolist(), targets.tolist()):
+        specs.append((names[s], names[t], layout.elements[names[t]].color if top_down else None))
+    return specs
+
+# Run a search for each (start, target, top_down) in specs, spread over
+# a pool of processes in chunks. Returns a dict with the search times
+# and the number of fixations as arrays, and if scanpaths is set, the
+# scanpaths as a 2-D array of element positions (in the order of
+# layout.elements), padded with -1. With guided = False the plain
+# exhaustive_visual_search is used and top_down is ignored.
+def run_searches(layout, specs, guided = True, scanpaths = False, processes = None, chunksize = None):
+    specs = list(specs)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, math.ceil(len(specs) / (processes * 4)))
+    chunks = [specs[i:i+chunksize] for i in range(0, len(specs), chunksize)]
+
+    if processes == 1 or len(chunks) <= 1:
+        _init_worker(layout)
+        results = [_run_chunk(c, guided, scanpaths) for c in chunks]
+    else:
+        with ProcessPoolExecutor(processes, initializer = _init_worker, initargs = (layout,)) as pool:
+            results = list(pool.map(_run_chunk, chunks, [guided]*len(chunks), [scanpaths]*len(chunks)))
+
+    res = {
+        "time": np.concatenate([r[0] for r in results]) if results else np.zeros(0),
+        "fixations": np.concatenate([r[1] for r in results]) if results else np.zeros(0, dtype = int),
+        "scanpaths": None
+        }
+    if scanpaths:
+        paths = [p for r in results for p in r[2]]
+        res["scanpaths"] = np.full((len(paths), max([len(p) for p in paths], default = 0)), -1, dtype = int)
+        for i, p in enumerate(paths):
+            res["scanpaths"][i,:len(p)] = p
+    return res
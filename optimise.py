@@ -0,0 +1,213 @@
+# Optimise layouts by swapping the positions of elements, with
+# simulated annealing (or, at temperature 0, local search) chains run in
+# parallel processes.
+#
+# An objective holds a ui and its cost. swap(a, b) swaps two elements in
+# the ui and returns the new cost, after which either keep() or undo()
+# is called.
+
+import math
+import os
+import pickle
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import decision
+
+# Expected guided search time (ui.exhaustive_guided_visual_search) over
+# targets, weighted by weights (the element frequencies by default),
+# averaged over the starting elements starts (the eye location of the
+# ui by default). If top_down, each target is searched for by its
+# colour.
+#
+# The steps of every search are kept. After a swap, a search is
+# replayed up to its first step that has the eyes on a swapped element,
+# selects one, or sees one before or after the swap, and simulated from
+# there. Searches for targets with a learned position are always
+# simulated in full.
+class search_objective():
+
+    def __init__(self, ui, targets = None, weights = None, starts = None, top_down = False):
+        self.ui = ui
+        if targets is None:
+            targets = list(ui.elements)
+        if weights is None:
+            weights = [ui.elements[t].frequency for t in targets]
+        if starts is None:
+            starts = [ui.eye_loc]
+        total = float(sum(weights))
+        self.terms = [(s, t, w / total / len(starts)) for t, w in zip(targets, weights) for s in starts]
+        self.top_down = top_down
+        self.simulations = 0
+        # Search steps worked out, and taken from the kept ones
+        self.simulated_steps = 0
+        self.replayed_steps = 0
+        self.cost = self.evaluate()
+
+    # Simulate one search, taking the steps in replay as they are.
+    # Returns its time and its steps (None if the target has a learned
+    # position, so that it is never replayed).
+    def simulate(self, start, target, replay = ()):
+        ui = self.ui
+        top_down = ui.elements[target].color if self.top_down else None
+        trace = []
+        self.simulations += 1
+        mt, scanpath, replayed = ui._guided_search(start, target, top_down, trace = trace, replay = replay)
+        self.replayed_steps += replayed
+        self.simulated_steps += len(trace) - replayed
+        if target in ui.ltm_pos:
+            return mt, None
+        return mt, np.array(trace, dtype = int).reshape(-1, 2)
+
+    # Simulate every search and return the cost.
+    def evaluate(self):
+        self.times = np.zeros(len(self.terms))
+        self.traces = []
+        for k, (s, t, w) in enumerate(self.terms):
+            self.times[k], trace = self.simulate(s, t)
+            self.traces.append(trace)
+        return self._total(self.times)
+
+    def _total(self, times):
+        # Add up in term order so that delta and full evaluations agree
+        return float(np.cumsum(times * np.array([w for s, t, w in self.terms]))[-1])
+
+    def swap(self, a, b):
+        ui = self.ui
+        ia, ib = ui.store.index[a], ui.store.index[b]
+        # The eye locations from which the swap can change a step
+        seen = ui.visible_from(a) | ui.visible_from(b)
+        ui.swap_elements(a, b)
+        seen |= ui.visible_from(a) | ui.visible_from(b)
+        seen[[ia, ib]] = True
+        self._swapped = (a, b)
+        self._old = (self.cost, self.times, self.traces)
+        times = self.times.copy()
+        traces = list(self.traces)
+        for k, (s, t, w) in enumerate(self.terms):
+            trace = traces[k]
+            if trace is None:
+                times[k], traces[k] = self.simulate(s, t)
+                continue
+            changed = seen[trace[:,0]] | (trace[:,1] == ia) | (trace[:,1] == ib)
+            if changed.any():
+                first = int(changed.argmax())
+                times[k], traces[k] = self.simulate(s, t, trace[:first].tolist())
+        self.times = times
+        self.traces = traces
+        self.cost = self._total(times)
+        return self.cost
+
+    def keep(self):
+        self._old = None
+
+    def undo(self):
+        self.ui.swap_elements(*self._swapped)
+        self.cost, self.times, self.traces = self._old
+        self._old = None
+
+# Mean decision time of decision.make_decisions over the value grids
+# values_2d (a row per trial, in element order). Every swap is evaluated
+# in full, as the trials are run together anyway.
+class decision_objective():
+
+    def __init__(self, ui, values_2d, color = False, start = None):
+        self.ui = ui
+        self.values = np.asarray(values_2d, dtype = float)
+        self.color = color
+        self.start = start
+        self.simulations = 0
+        self.cost = self.evaluate()
+
+    def evaluate(self):
+        self.simulations += len(self.values)
+        times, lengths, decisions = decision.make_decisions(self.ui, self.values, self.color, self.start)
+        return float(np.mean(times))
+
+    def swap(self, a, b):
+        self.ui.swap_elements(a, b)
+        self._swapped = (a, b)
+        self._old = self.cost
+        self.cost = self.evaluate()
+        return self.cost
+
+    def keep(self):
+        self._old = None
+
+    def undo(self):
+        self.ui.swap_elements(*self._swapped)
+        self.cost = self._old
+        self._old = None
+
+# Run one annealing chain on objective, which it modifies, for
+# iterations swaps of random pairs of elements (only of equal size, if
+# same_size). The temperature falls geometrically from t_start to t_end;
+# with t_start 0 only improvements are kept. Returns the best cost, the
+# element positions at it, and the history of (iteration, cost) at
+# every improvement.
+def anneal(objective, iterations = 1000, t_start = 0.0, t_end = 1e-4, same_size = False, seed = None):
+    rng = random.Random(seed)
+    ui = objective.ui
+    names = list(ui.elements)
+    if same_size:
+        groups = {}
+        for e in names:
+            groups.setdefault((ui.elements[e].x_size, ui.elements[e].y_size), []).append(e)
+        groups = [g for g in groups.values() if len(g) > 1]
+        if not groups:
+            raise ValueError("no two elements have the same size")
+    best = objective.cost
+    best_positions = {e: (ui.elements[e].x, ui.elements[e].y) for e in names}
+    history = [(0, best)]
+    for i in range(iterations):
+        if same_size:
+            group = rng.choice(groups)
+            a, b = rng.sample(group, 2)
+        else:
+            a, b = rng.sample(names, 2)
+        old = objective.cost
+        new = objective.swap(a, b)
+        t = t_start * (t_end / t_start) ** (i / max(iterations - 1, 1)) if t_start > 0 else 0
+        if new <= old or (t > 0 and rng.random() < math.exp((old - new) / t)):
+            objective.keep()
+            if new < best:
+                best = new
+                best_positions = {e: (ui.elements[e].x, ui.elements[e].y) for e in names}
+                history.append((i + 1, best))
+        else:
+            objective.undo()
+    return best, best_positions, history
+
+def _run_chain(objective, seed, options):
+    objective = pickle.loads(objective)
+    best, positions, history = anneal(objective, seed = seed, **options)
+    return {"seed": seed, "cost": best, "positions": positions, "history": history, "simulations": objective.simulations}
+
+# Run chains independent annealing chains of objective, seeded with
+# seed, seed+1, ..., in a pool of processes. options go to anneal.
+# Returns the results of the chains, best first, each a dict of the
+# seed, the cost, the element positions, the history and the number of
+# searches simulated.
+def optimise(objective, chains = None, seed = 0, processes = None, **options):
+    if chains is None:
+        chains = os.cpu_count() or 1
+    state = pickle.dumps(objective)
+    if processes is None:
+        processes = min(chains, os.cpu_count() or 1)
+    if processes <= 1:
+        results = [_run_chain(state, seed + c, options) for c in range(chains)]
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(_run_chain, [state]*chains, [seed + c for c in range(chains)], [options]*chains))
+    return sorted(results, key = lambda r: r["cost"])
+
+# Return a copy of ui with the element positions of a result of
+# optimise or anneal.
+def apply_positions(ui, positions):
+    ui = pickle.loads(pickle.dumps(ui))
+    for e, (x, y) in positions.items():
+        ui.modify_element(e, 'x', x)
+        ui.modify_element(e, 'y', y)
+    return ui
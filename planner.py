@@ -0,0 +1,172 @@
+# Solve the decision task of decision2.py by value iteration over
+# belief states instead of learning its Q values.
+#
+# The belief state is which colours are known (K), how many of them are
+# green (g), and the element the eyes are on. Given the distribution of
+# randomise_decision_ui (the answer, then the number of greens uniformly
+# in its range, then a random subset of that size), this is all that
+# matters: the posterior of the answer depends only on |K| and g, and
+# the colours still hidden are exchangeable. Fixating element a takes
+# the EMMA time from the eyes plus the encoding penalty, moves the eyes
+# if EMMA says so, and reveals the colour of a (and, with colours, of
+# its neighbours as in do_step); accepting or rejecting takes 0.5 s and
+# ends the task.
+#
+# The Q values are the expected undiscounted reward to go, with the
+# time cost of calculate_reward paid step by step: -time_cost * step
+# time for each step, plus the correct or incorrect reward at the end.
+
+import math
+
+import numpy as np
+
+import decision2
+
+# The distribution of the number of greens of randomise_decision_ui
+# for n elements, as a dict of probabilities.
+def greens_prior(n):
+    prior = {}
+    for answer, low, high in ((1, round(n/2)+1, n-1), (0, 0, round(n/2)-1)):
+        for G in range(low, high + 1):
+            prior[G] = prior.get(G, 0) + 0.5 / (high - low + 1)
+    return prior
+
+def _is_accept(n, G):
+    return G > n/2
+
+class belief_model():
+
+    def __init__(self, n):
+        self.n = n
+        self.prior = greens_prior(n)
+        self._posteriors = {}
+        self._outcomes = {}
+
+    # The distribution of the total number of greens after seeing g
+    # greens among k elements.
+    def posterior(self, k, g):
+        if (k, g) not in self._posteriors:
+            n = self.n
+            p = {G: w * math.comb(G, g) * math.comb(n - G, k - g) for G, w in self.prior.items()}
+            s = sum(p.values())
+            self._posteriors[(k, g)] = {G: v / s for G, v in p.items() if v > 0}
+        return self._posteriors[(k, g)]
+
+    # The probability that accept is the right answer.
+    def p_accept(self, k, g):
+        return sum(p for G, p in self.posterior(k, g).items() if _is_accept(self.n, G))
+
+    # The distribution of the number of greens among m newly revealed
+    # elements, as a list of (greens, probability).
+    def outcomes(self, k, g, m):
+        if (k, g, m) not in self._outcomes:
+            unknown = self.n - k
+            dist = {}
+            for G, p in self.posterior(k, g).items():
+                for h in range(0, m + 1):
+                    w = math.comb(G - g, h) * math.comb(unknown - (G - g), m - h)
+                    if w:
+                        dist[h] = dist.get(h, 0) + p * w / math.comb(unknown, m)
+            self._outcomes[(k, g, m)] = sorted(dist.items())
+        return self._outcomes[(k, g, m)]
+
+# Solve the decision task on ui by value iteration. Returns a
+# decision_task agent with belief states whose Q table holds the
+# optimal Q values for every reachable belief state; its greedy policy
+# (epsilon 0) is optimal. The values converge when no step improves
+# by more than tolerance.
+def plan_decision_agent(ui, colours = True, time_cost = 1, incorrect_reward = 0, encoding_penalty = 0, tolerance = 1e-9, max_iterations = 10000):
+    agent = decision2.decision_task(ui, colours, time_cost, belief = True)
+    agent.encoding_penalty = encoding_penalty
+    agent.incorrect_reward = incorrect_reward
+    names = list(ui.elements)
+    n = len(names)
+    model = belief_model(n)
+
+    emma_t, emma_moved = ui.emma_table()
+    emma_t = emma_t.tolist()
+    emma_moved = emma_moved.tolist()
+    if colours:
+        reveals = [sum(1 << j for j in range(n) if row[j]) for row in agent.neighbours.tolist()]
+    else:
+        reveals = [1 << a for a in range(n)]
+
+    def code(known, greens, eye):
+        return known + (greens << n) + (eye << 2*n)
+
+    # Enumerate the reachable belief states and their transitions.
+    index = {}
+    states = []
+    for eye in range(n):
+        index[code(0, 0, eye)] = len(states)
+        states.append((0, 0, eye))
+    rows, actions, nexts, probs = [], [], [], []
+    step_costs = []
+    free_repeats = []
+    s = 0
+    while s < len(states):
+        known, greens, eye = states[s]
+        k = bin(known).count("1")
+        costs = []
+        for a in range(n):
+            costs.append(-time_cost * (emma_t[eye][a] + encoding_penalty))
+            new = reveals[a] & ~known
+            if new == 0 and costs[-1] == 0:
+                free_repeats.append(s * n + a)
+            new_eye = a if emma_moved[eye][a] else eye
+            for h, p in model.outcomes(k, greens, bin(new).count("1")):
+                c = code(known | new, greens + h, new_eye)
+                if c not in index:
+                    index[c] = len(states)
+                    states.append((known | new, greens + h, new_eye))
+                rows.append(s)
+                actions.append(a)
+                nexts.append(index[c])
+                probs.append(p)
+        step_costs.append(costs)
+        s += 1
+
+    S = len(states)
+    rows = np.array(rows)
+    actions = np.array(actions)
+    nexts = np.array(nexts)
+    probs = np.array(probs)
+    flat = rows * n + actions
+    step_costs = np.array(step_costs)
+    # A fixation that reveals nothing and costs nothing (time_cost 0)
+    # leaves the belief as it is, so its Q ties with the best action
+    # and the greedy policy could repeat it forever. Rule it out.
+    step_costs.ravel()[free_repeats] = -np.inf
+    q = np.zeros((S, n + 2))
+
+    p1 = np.array([model.p_accept(bin(known).count("1"), greens) for known, greens, eye in states])
+    stop = -time_cost * 0.5
+    q[:,n] = p1 * agent.correct_reward + (1 - p1) * agent.incorrect_reward + stop
+    q[:,n+1] = (1 - p1) * agent.correct_reward + p1 * agent.incorrect_reward + stop
+
+    # Stopping at once is a lower bound on the values, so the iterates
+    # rise monotonically to the optimum.
+    v = q[:,n:].max(axis = 1)
+    for iteration in range(max_iterations):
+        expected = np.bincount(flat, weights = probs * v[nexts], minlength = S * n).reshape(S, n)
+        q[:,:n] = step_costs + expected
+        new_v = q.max(axis = 1)
+        change = float(np.abs(new_v - v).max())
+        v = new_v
+        if change <= tolerance:
+            break
+
+    agent.q = q
+    agent.states = dict(zip((code(*st) for st in states), range(S)))
+    agent.epsilon = 0
+    agent.learning = False
+    agent.iterations = iteration + 1
+    agent.clear()
+    return agent
+
+# The expected reward of the planned policy over the starting eye
+# locations, from the Q table of plan_decision_agent.
+def expected_reward(agent):
+    n = len(agent.ui.elements)
+    rows = [agent.states[e << 2*n] for e in range(n)]
+    return float(agent.q[rows].max(axis = 1).mean())
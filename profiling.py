@@ -0,0 +1,114 @@
+# Opt-in call counts and cumulative wall time for the hot paths of the
+# model. enable() replaces the target methods on their classes with
+# counting wrappers and disable() puts the originals back, so when
+# profiling is off nothing is left in the way.
+#
+#   profiling.enable()
+#   agent = decision2.train_decision_maker(...)
+#   profiling.disable()
+#   print(profiling.summary())
+
+import contextlib
+import functools
+import importlib
+import json
+import time
+
+# Targets as module.class.method
+default_targets = [
+    "ui.ui.bottom_up_activation",
+    "ui.ui.bottom_up_activation_array",
+    "ui.ui.top_down_activation",
+    "ui.ui.top_down_activation_array",
+    "ui.ui.total_activation",
+    "ui.ui.emma_time",
+    "ui.ui.element_distance",
+    "ui.ui.exhaustive_guided_visual_search",
+    "decision2.decision_task.do_step",
+    "decision2.decision_task.set_state",
+    "decision2.decision_task.choose_action_epsilon_greedy",
+    "decision2.decision_task.choose_action_softmax",
+    "decision2.decision_task_batch.step",
+    ]
+
+_originals = {} # target: (owner, name, original)
+_counts = {} # target: [calls, seconds]
+
+def _resolve(target):
+    module, owner, name = target.rsplit(".", 2)
+    owner = getattr(importlib.import_module(module), owner)
+    return owner, name
+
+def _wrap(target, f):
+    stats = _counts.setdefault(target, [0, 0.0])
+    clock = time.perf_counter
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        start = clock()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            stats[0] += 1
+            stats[1] += clock() - start
+    return wrapper
+
+# Start counting calls to targets (the default ones if not given).
+def enable(targets = None):
+    for target in targets or default_targets:
+        if target in _originals:
+            continue
+        owner, name = _resolve(target)
+        original = owner.__dict__[name]
+        _originals[target] = (owner, name, original)
+        setattr(owner, name, _wrap(target, original))
+
+# Stop counting and restore the original methods. The counts are kept
+# until reset().
+def disable():
+    for target, (owner, name, original) in _originals.items():
+        setattr(owner, name, original)
+    _originals.clear()
+
+def enabled():
+    return bool(_originals)
+
+def reset():
+    for stats in _counts.values():
+        stats[0] = 0
+        stats[1] = 0.0
+
+# Profile a block: with profiling.profiled(): ...
+@contextlib.contextmanager
+def profiled(targets = None):
+    enable(targets)
+    try:
+        yield
+    finally:
+        disable()
+
+# The counts as a list of dicts, most time first. Times include the
+# time spent in other profiled functions called from the function.
+def stats():
+    rows = []
+    for target, (calls, seconds) in _counts.items():
+        if calls:
+            rows.append({"function": target, "calls": calls, "seconds": seconds,
+                         "microseconds_per_call": 1e6 * seconds / calls})
+    return sorted(rows, key = lambda r: -r["seconds"])
+
+def summary():
+    rows = stats()
+    width = max([len("function")] + [len(r["function"]) for r in rows])
+    lines = ["function".ljust(width) + "       calls     seconds    us/call"]
+    for r in rows:
+        lines.append(r["function"].ljust(width) + str(r["calls"]).rjust(12) +
+                     ("%.4f" % r["seconds"]).rjust(12) + ("%.2f" % r["microseconds_per_call"]).rjust(11))
+    return "\n".join(lines)
+
+# The stats as JSON, written to path if given.
+def to_json(path = None):
+    text = json.dumps(stats(), indent = 1)
+    if path is not None:
+        with open(path, "w") as f:
+            f.write(text)
+    return text
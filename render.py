@@ -0,0 +1,109 @@
+# Batch rendering without pyplot or a GUI: elements are drawn as one
+# collection of rectangles and the scanpaths as one collection of lines
+# and one of fixation circles, on figures drawn with the Agg backend
+# (or the SVG one when saving .svg files). This module never imports
+# pyplot; the interactive plots are in visualise.py.
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection, LineCollection, EllipseCollection
+import numpy as np
+import os
+
+# A figure, not registered with pyplot, with axes set up for ui.
+def layout_figure(ui, width = 6, dpi = 100):
+    x_size = max(ui.x_size, 1)
+    y_size = max(ui.y_size, 1)
+    fig = Figure(figsize = (width, width * y_size / x_size), dpi = dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_xlim(0, x_size)
+    ax.set_ylim(y_size, 0)
+    ax.set_aspect('equal')
+    ax.set_axis_off()
+    return fig, ax
+
+# Draw the elements of ui on ax as a single collection.
+def draw_elements(ax, ui, show_text = False):
+    st = ui.store
+    x0, y0, x1, y1 = st.x, st.y, st.x + st.x_size, st.y + st.y_size
+    rects = np.stack([np.stack((x0, y0), axis = 1), np.stack((x1, y0), axis = 1),
+                      np.stack((x1, y1), axis = 1), np.stack((x0, y1), axis = 1)], axis = 1)
+    colors = [st.color_names[c] or "C0" for c in st.color.tolist()]
+    ax.add_collection(PolyCollection(rects, facecolors = colors, edgecolors = "none"))
+    if show_text:
+        for name, x, y in zip(st.names, x0.tolist(), y0.tolist()):
+            ax.text(x, y, name)
+
+# Scanpaths as arrays of element rows: lists of element names, or rows
+# of an int array padded with -1 as returned by montecarlo.run_searches.
+def _scanpath_rows(ui, scanpaths):
+    index = ui.store.index
+    rows = []
+    for s in scanpaths:
+        if isinstance(s, np.ndarray):
+            rows.append(s[s >= 0].astype(int))
+        else:
+            rows.append(np.array([index[e] for e in s], dtype = int))
+    return rows
+
+def _scanpath_geometry(locs, rows):
+    segments = [np.stack((locs[r[:-1]], locs[r[1:]]), axis = 1) for r in rows if len(r) > 1]
+    segments = np.concatenate(segments) if segments else np.zeros((0, 2, 2))
+    fixations = np.concatenate([locs[r] for r in rows]) if rows else np.zeros((0, 2))
+    return segments, fixations
+
+def _element_centres(ui):
+    st = ui.store
+    return np.stack((np.round(st.x + st.x_size/2), np.round(st.y + st.y_size/2)), axis = 1)
+
+# The fixation circle radius of visualise_UI.
+def _fixation_radius(ui):
+    st = ui.store
+    return max(float((st.x + st.x_size).max()), float((st.y + st.y_size).max())) / 20
+
+# Draw scanpaths on ax: every saccade in one line collection and every
+# fixation in one collection of circles (of the radius used by
+# visualise_UI unless given, in layout units).
+def draw_scanpaths(ax, ui, scanpaths, color = "red", alpha = 0.2, linewidth = 1, radius = None):
+    if radius is None:
+        radius = _fixation_radius(ui)
+    segments, fixations = _scanpath_geometry(_element_centres(ui), _scanpath_rows(ui, scanpaths))
+    lines = LineCollection(segments, colors = color, linewidths = linewidth, alpha = min(1, 5*alpha))
+    circles = EllipseCollection(2*radius, 2*radius, 0, units = 'xy', offsets = fixations,
+                                offset_transform = ax.transData, facecolors = color, alpha = alpha)
+    ax.add_collection(lines)
+    ax.add_collection(circles)
+    return lines, circles
+
+# Render ui with all the scanpaths in one figure and write it to path;
+# the format follows the extension (png, svg, pdf...).
+def save_scanpaths(ui, scanpaths, path, show_text = False, width = 6, dpi = 100, **style):
+    fig, ax = layout_figure(ui, width, dpi)
+    draw_elements(ax, ui, show_text)
+    draw_scanpaths(ax, ui, scanpaths, **style)
+    fig.savefig(path)
+    return path
+
+# Render every scanpath into its own figure in directory, named by
+# names (default 0, 1, 2, ...) with extension format. The layout is
+# drawn once and only the scanpath collections change between files.
+# Returns the paths written.
+def save_scanpath_figures(ui, scanpaths, directory, format = "png", names = None, show_text = False, width = 6, dpi = 100, **style):
+    os.makedirs(directory, exist_ok = True)
+    fig, ax = layout_figure(ui, width, dpi)
+    draw_elements(ax, ui, show_text)
+    rows = _scanpath_rows(ui, scanpaths)
+    if names is None:
+        names = [str(i) for i in range(len(rows))]
+    locs = _element_centres(ui)
+    lines, circles = draw_scanpaths(ax, ui, [], **style)
+    paths = []
+    for name, r in zip(names, rows):
+        segments, fixations = _scanpath_geometry(locs, [r])
+        lines.set_segments(segments)
+        circles.set_offsets(fixations)
+        path = os.path.join(directory, str(name) + "." + format)
+        fig.savefig(path)
+        paths.append(path)
+    return paths
@@ -0,0 +1,89 @@
+# Train and evaluate decision agents (decision2.py) over a grid of
+# parameters and seeds, one cell per worker process.
+
+import contextlib
+import csv
+import io
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import decision2
+
+# The training configurations listed at the bottom of decision2.py.
+configurations = [
+    {"colours": False, "time_cost": 1, "incorrect_reward": 0, "encoding_penalty": 0},
+    {"colours": True, "time_cost": 1, "incorrect_reward": 0, "encoding_penalty": 0},
+    {"colours": False, "time_cost": 1, "incorrect_reward": -10, "encoding_penalty": 0},
+    {"colours": True, "time_cost": 1, "incorrect_reward": -10, "encoding_penalty": 0},
+    {"colours": False, "time_cost": 5, "incorrect_reward": 0, "encoding_penalty": 0},
+    {"colours": True, "time_cost": 5, "incorrect_reward": 0, "encoding_penalty": 0},
+    {"colours": False, "time_cost": 1, "incorrect_reward": 0, "encoding_penalty": 1},
+    {"colours": True, "time_cost": 1, "incorrect_reward": 0, "encoding_penalty": 1},
+    ]
+
+# Return the cells of the full grid over the given values, each with
+# every seed.
+def parameter_grid(colours = (False, True), time_cost = (1,), incorrect_reward = (0,), encoding_penalty = (0,), seeds = (0,)):
+    cells = []
+    for c, t, i, e, s in itertools.product(colours, time_cost, incorrect_reward, encoding_penalty, seeds):
+        cells.append({"colours": c, "time_cost": t, "incorrect_reward": i, "encoding_penalty": e, "seed": s})
+    return cells
+
+# Return the given configurations (by default the ones above), each
+# with every seed.
+def with_seeds(configs = configurations, seeds = (0,)):
+    return [dict(c, seed = s) for c in configs for s in seeds]
+
+def _run_cell(cell, ui, episodes, n_envs, n_eval, train_options):
+    seed = cell.get("seed")
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = decision2.train_decision_maker(ui, colours = cell["colours"], time_cost = cell["time_cost"],
+                                               incorrect_reward = cell["incorrect_reward"],
+                                               encoding_penalty = cell["encoding_penalty"],
+                                               episodes = episodes, n_envs = n_envs, seed = seed,
+                                               **(train_options or {}))
+    trained = time.perf_counter()
+    results = decision2.evaluate_decision_agent(agent, n = n_eval, seed = seed)
+    row = dict(cell)
+    for name in ("accuracy", "task_time", "fixations"):
+        row[name] = results[name]
+        row[name + "_low"], row[name + "_high"] = results[name + "_ci"]
+    row.update({
+        "stuck": results["stuck"],
+        "episodes": agent.episodes_trained,
+        "states": len(agent.states),
+        "train_seconds": trained - start,
+        "eval_seconds": time.perf_counter() - trained
+        })
+    return row
+
+# Train an agent for every cell (a dict of train_decision_maker
+# arguments and a seed) and evaluate it with evaluate_decision_agent.
+# Cells run in a pool of processes. Returns a list of rows, one per
+# cell in the given order, with the cell parameters and the results.
+# train_options are passed on to train_decision_maker, e.g. the
+# early stopping tolerance.
+def run_sweep(cells, ui = None, episodes = 800000, n_envs = None, n_eval = 1000, processes = None, train_options = None):
+    if ui is None:
+        ui = decision2.decision_ui
+    cells = list(cells)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(cells))
+    n = len(cells)
+    if processes <= 1:
+        return [_run_cell(c, ui, episodes, n_envs, n_eval, train_options) for c in cells]
+    with ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(_run_cell, cells, [ui]*n, [episodes]*n, [n_envs]*n, [n_eval]*n, [train_options]*n))
+
+# Write sweep results as CSV.
+def write_csv(rows, path):
+    if not rows:
+        return
+    with open(path, "w", newline = "") as f:
+        writer = csv.DictWriter(f, fieldnames = list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
@@ -2,19 +2,189 @@
 # sequential Fitts' law.
 
 import math
-
+import numpy as np
+
+# EMMA (Salvucci, 2001) parameters, shared by the scalar and the table
+# versions of the fixation time formula.
+emma_KK = 0.006
+emma_k = 0.4
+emma_prep = 0.135
+emma_exec = 0.07
+emma_saccade = 0.002
+
+# WHo model (Guiard et al., 2011) parameters.
+WHo_x0 = 0.092
+WHo_y0 = 0.0018
+WHo_alpha = 0.6
+
+# Apply a math module function elementwise over arrays. numpy's own
+# atan, exp and log can differ from math's in the last bit, which is
+# enough to break ties between equally activated elements, so anything
+# that must agree with the scalar model goes through this.
+def _libm(f, *args):
+    args = np.broadcast_arrays(*[np.asarray(a, dtype = float) for a in args])
+    out = np.fromiter(map(f, *[a.ravel().tolist() for a in args]), dtype = float, count = args[0].size)
+    return out.reshape(args[0].shape)
+
+# Structure-of-arrays store behind the elements of a ui. Coordinates,
+# sizes and frequencies are kept in contiguous float arrays and colours
+# as integer codes, so that the vectorised code can use them directly.
+# version is bumped on every change that affects the geometry, and
+# recolours on every change of colour.
+class element_store:
+    def __init__(self, capacity = 16):
+        self.n = 0
+        self.names = []
+        self.index = {}
+        self.data = []
+        self.color_names = []
+        self.color_codes = {}
+        self.version = 0
+        self.recolours = 0
+
+        self._x = np.zeros(capacity)
+        self._y = np.zeros(capacity)
+        self._x_size = np.zeros(capacity)
+        self._y_size = np.zeros(capacity)
+        self._frequency = np.zeros(capacity)
+        self._color = np.zeros(capacity, dtype = np.int32)
+
+    # Add an element and return its row. As with a dict, adding a name
+    # that already exists replaces it in place.
+    def add(self, name, x, y, x_size, y_size, color, frequency):
+        if name in self.index:
+            i = self.index[name]
+        else:
+            i = self.n
+            if i == len(self._x):
+                self._grow()
+            self.names.append(name)
+            self.index[name] = i
+            self.data.append(None)
+            self.n += 1
+        self._x[i] = x
+        self._y[i] = y
+        self._x_size[i] = x_size
+        self._y_size[i] = y_size
+        self._frequency[i] = frequency
+        self._color[i] = self.color_code(color)
+        self.data[i] = None
+        self.version += 1
+        return i
+
+    def _grow(self):
+        for a in ('_x', '_y', '_x_size', '_y_size', '_frequency', '_color'):
+            old = getattr(self, a)
+            new = np.zeros(2*len(old), dtype = old.dtype)
+            new[:len(old)] = old
+            setattr(self, a, new)
+
+    def color_code(self, color):
+        if color not in self.color_codes:
+            self.color_codes[color] = len(self.color_names)
+            self.color_names.append(color)
+        return self.color_codes[color]
+
+    @property
+    def x(self):
+        return self._x[:self.n]
+
+    @property
+    def y(self):
+        return self._y[:self.n]
+
+    @property
+    def x_size(self):
+        return self._x_size[:self.n]
+
+    @property
+    def y_size(self):
+        return self._y_size[:self.n]
+
+    @property
+    def frequency(self):
+        return self._frequency[:self.n]
+
+    @property
+    def color(self):
+        return self._color[:self.n]
+
+# An element is a view to one row of an element_store. Without a store
+# it gets one of its own.
 class element:
-    def __init__(self, name, x, y, x_size, y_size, color = "grey", frequency = 0.1):
-        self.name = name
-        self.x = x
-        self.y = y
-        self.x_size = x_size
-        self.y_size = y_size
-        self.color = color
-
-        self.data = None
-
-        self.frequency = frequency
+    __slots__ = ('_store', '_i')
+
+    def __init__(self, name, x, y, x_size, y_size, color = "grey", frequency = 0.1, store = None):
+        if store is None:
+            store = element_store(1)
+        self._store = store
+        self._i = store.add(name, x, y, x_size, y_size, color, frequency)
+
+    @property
+    def name(self):
+        return self._store.names[self._i]
+
+    @property
+    def x(self):
+        return float(self._store._x[self._i])
+
+    @x.setter
+    def x(self, val):
+        self._store._x[self._i] = val
+        self._store.version += 1
+
+    @property
+    def y(self):
+        return float(self._store._y[self._i])
+
+    @y.setter
+    def y(self, val):
+        self._store._y[self._i] = val
+        self._store.version += 1
+
+    @property
+    def x_size(self):
+        return float(self._store._x_size[self._i])
+
+    @x_size.setter
+    def x_size(self, val):
+        self._store._x_size[self._i] = val
+        self._store.version += 1
+
+    @property
+    def y_size(self):
+        return float(self._store._y_size[self._i])
+
+    @y_size.setter
+    def y_size(self, val):
+        self._store._y_size[self._i] = val
+        self._store.version += 1
+
+    @property
+    def frequency(self):
+        return float(self._store._frequency[self._i])
+
+    @frequency.setter
+    def frequency(self, val):
+        self._store._frequency[self._i] = val
+        self._store.version += 1
+
+    @property
+    def color(self):
+        return self._store.color_names[self._store._color[self._i]]
+
+    @color.setter
+    def color(self, val):
+        self._store._color[self._i] = self._store.color_code(val)
+        self._store.recolours += 1
+
+    @property
+    def data(self):
+        return self._store.data[self._i]
+
+    @data.setter
+    def data(self, val):
+        self._store.data[self._i] = val
 
     # Return middle coordinate
     def loc(self):
@@ -23,13 +193,137 @@ class element:
     def max_size(self):
         return max(self.x_size, self.y_size)    
 
+# Uniform grid of buckets over element centres, for nearest element and
+# radius queries that only look at the buckets near the query point.
+# Elements are referred to by their row in the element_store.
+class grid_index:
+    def __init__(self, locs, version):
+        n = len(locs)
+        self.xs = [float(v) for v in locs[:,0]]
+        self.ys = [float(v) for v in locs[:,1]]
+        # Aim for about one element per bucket.
+        if n:
+            area = (locs[:,0].max() - locs[:,0].min() + 1) * (locs[:,1].max() - locs[:,1].min() + 1)
+            self.cell = max(1.0, math.sqrt(area / n))
+        else:
+            self.cell = 1.0
+        self.cells = {}
+        self.bounds = None
+        for i in range(n):
+            self._insert(i)
+        self.version = version
+
+    def _key(self, x, y):
+        return (math.floor(x / self.cell), math.floor(y / self.cell))
+
+    def _insert(self, i):
+        k = self._key(self.xs[i], self.ys[i])
+        self.cells.setdefault(k, []).append(i)
+        if self.bounds is None:
+            self.bounds = [k[0], k[0], k[1], k[1]]
+        else:
+            self.bounds = [min(self.bounds[0], k[0]), max(self.bounds[1], k[0]),
+                           min(self.bounds[2], k[1]), max(self.bounds[3], k[1])]
+
+    # Add element i, or move it if it is already in the index.
+    def move(self, i, loc):
+        if i < len(self.xs):
+            self.cells[self._key(self.xs[i], self.ys[i])].remove(i)
+            self.xs[i] = float(loc[0])
+            self.ys[i] = float(loc[1])
+        else:
+            self.xs.append(float(loc[0]))
+            self.ys.append(float(loc[1]))
+        self._insert(i)
+
+    # Return the elements closest to loc, more than one if there is a
+    # tie. If allowed (a boolean array by row) is given, only those
+    # elements are considered.
+    def nearest(self, loc, allowed = None):
+        if self.bounds is None:
+            return []
+        cx, cy = self._key(loc[0], loc[1])
+        last = max(abs(cx - self.bounds[0]), abs(cx - self.bounds[1]),
+                   abs(cy - self.bounds[2]), abs(cy - self.bounds[3]))
+        best = None
+        found = []
+        r = 0
+        while r <= last:
+            for k in self._ring(cx, cy, r):
+                for i in self.cells.get(k, ()):
+                    if allowed is not None and not allowed[i]:
+                        continue
+                    d = math.sqrt(math.pow(loc[0] - self.xs[i], 2) +
+                                  math.pow(loc[1] - self.ys[i], 2))
+                    if best is None or d < best:
+                        best = d
+                        found = [i]
+                    elif d == best:
+                        found.append(i)
+            # Anything outside the rings searched so far is at least
+            # r*cell away.
+            if best is not None and best < r*self.cell:
+                break
+            r += 1
+        return found
+
+    def _ring(self, cx, cy, r):
+        if r == 0:
+            return [(cx, cy)]
+        ring = []
+        for x in range(cx - r, cx + r + 1):
+            ring.append((x, cy - r))
+            ring.append((x, cy + r))
+        for y in range(cy - r + 1, cy + r):
+            ring.append((cx - r, y))
+            ring.append((cx + r, y))
+        return ring
+
+    # Return the elements whose centre is in the buckets overlapping
+    # the square around loc with half side radius. The caller checks
+    # the exact distances.
+    def within(self, loc, radius):
+        if self.bounds is None:
+            return np.zeros(0, dtype = int)
+        if radius == math.inf:
+            x0, x1, y0, y1 = self.bounds
+        else:
+            x0, y0 = self._key(loc[0] - radius, loc[1] - radius)
+            x1, y1 = self._key(loc[0] + radius, loc[1] + radius)
+            x0 = max(x0, self.bounds[0])
+            x1 = min(x1, self.bounds[1])
+            y0 = max(y0, self.bounds[2])
+            y1 = min(y1, self.bounds[3])
+        found = []
+        cells = self.cells
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                if (x, y) in cells:
+                    found.extend(cells[(x, y)])
+        return np.array(found, dtype = int)
+
 class ui:
     def __init__(self, x_size = 100, y_size = 100):
         self.x_size = x_size
         self.y_size = y_size
 
+        self.store = element_store()
         self.elements = {}
-        self.distances = {}
+
+        # Element x element distance, visual angle, EMMA, visibility
+        # and bottom-up activation tables, built lazily by
+        # _build_tables(). swap_elements updates them in place and other
+        # layout changes drop them. Above cache_limit elements they are
+        # not kept and the values are computed on the fly.
+        self.cache_limit = 2000
+        self._index = None
+
+        # Spatial index on element centres, used by closest_element
+        # and by the visibility test when there are no tables, for
+        # layouts with at least index_threshold elements. It is kept
+        # up to date by add_element, swap_elements and modify_element.
+        self.index_threshold = 200
+        self._grid = None
 
         self.fitts_a = 0.230
         self.fitts_b = 0.166
@@ -42,15 +336,20 @@ class ui:
         self.ltm_color = {}
         self.ltm_color_fact = {}
 
+    # Leave the cached tables out when pickling, for example when
+    # sending a layout to worker processes. They are rebuilt on use.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for k in ('_names', '_locs', '_acuity', '_visible_radius', '_dist', '_angle', '_emma', '_moved', '_visibility', '_last_visible', '_activation', '_activation_ok'):
+            state.pop(k, None)
+        state['_index'] = None
+        state['_grid'] = None
+        return state
 
     def calibrate_UI_size(self):
-        max_x = 0
-        max_y = 0
-        for e in self.elements:
-            if self.elements[e].x + self.elements[e].x_size > max_x:
-                max_x = self.elements[e].x + self.elements[e].x_size
-            if self.elements[e].y + self.elements[e].y_size > max_y:
-                max_y = self.elements[e].y + self.elements[e].y_size
+        st = self.store
+        max_x = max(0, float((st.x + st.x_size).max())) if st.n else 0
+        max_y = max(0, float((st.y + st.y_size).max())) if st.n else 0
 
         if max_x > self.x_size:
             #print("Note: adjusting UI x size from", self.x_size, "to", max_x)
@@ -92,23 +391,31 @@ class ui:
     # that is 2.5 times the longer side of the device dimensions.
     def calibrate_user_distance(self):
         self.user_distance = max(self.x_size,self.y_size)*2
+        self._invalidate()
 
     def add_element(self, name, x, y, x_size, y_size, color = "grey", frequency = 0.1):
-        e = element(name, x, y, x_size, y_size, color, frequency)
+        version = self.store.version
+        e = element(name, x, y, x_size, y_size, color, frequency, store = self.store)
         self.elements[e.name] = e
+        self._update_grid([name], version)
+        self._invalidate()
         self.calibrate_UI_size()
         if not self.eye_loc:
             self.eye_loc = e.name
 
     def swap_elements(self, e1, e2):
+        version = self.store.version
         x_1 = self.elements[e1].x
         y_1 = self.elements[e1].y
         self.elements[e1].x = self.elements[e2].x
         self.elements[e1].y = self.elements[e2].y
         self.elements[e2].x = x_1
         self.elements[e2].y = y_1
+        self._update_grid([e1, e2], version)
+        self._update_tables([e1, e2], version)
 
     def modify_element(self, name, var, val):
+        version = self.store.version
         if var == 'x':
             self.elements[name].x = val
         if var == 'y':
@@ -119,24 +426,183 @@ class ui:
             self.elements[name].y_size = val
         if var == 'color':
             self.elements[name].color = val
+        if var == 'frequency':
+            self.elements[name].frequency = val
+        self._update_grid([name], version)
+        self._invalidate()
+
+    # Return the spatial index, (re)building it if the layout has
+    # changed in ways it has not been told about.
+    def _spatial_index(self):
+        if self._grid is None or self._grid.version != self.store.version:
+            self._ensure_tables()
+            self._grid = grid_index(self._locs, self.store.version)
+        return self._grid
+
+    # Move the given elements in the spatial index, if it was up to
+    # date before they changed.
+    def _update_grid(self, names, version):
+        if self._grid is not None and self._grid.version == version:
+            for e in names:
+                self._grid.move(self.store.index[e], self.elements[e].loc())
+            self._grid.version = self.store.version
+
+    # The given elements have moved, keeping their sizes and
+    # frequencies. If the tables were up to date before, only their
+    # rows and columns are recomputed, in place; otherwise the tables
+    # are dropped.
+    def _update_tables(self, names, version):
+        if self._index is None or self._version != version:
+            self._invalidate()
+            return
+        st = self.store
+        idx = np.array([st.index[e] for e in names], dtype = int)
+        self._locs[idx] = np.stack((np.round(st.x[idx] + st.x_size[idx]/2), np.round(st.y[idx] + st.y_size[idx]/2)), axis = 1)
+        self._version = st.version
+        self._last_visible = (None, None)
+        if self._dist is None:
+            return
+        # The activation seen from the moved elements, and from where
+        # they are visible before or after, changes.
+        self._activation_ok[idx] = False
+        self._activation_ok[self._visibility[:,idx].any(axis = 1)] = False
+        # The same elementwise operations as _build_tables, so the
+        # values are exactly those of a rebuild.
+        d = self._locs[idx][:,None,:] - self._locs[None,:,:]
+        dist = np.sqrt(d[...,0]*d[...,0] + d[...,1]*d[...,1])
+        angle = self._visual_angles(dist)
+        emma, moved = EMMA_fixation_time_array(angle, st.frequency[None,:])
+        self._dist[idx] = dist
+        self._angle[idx] = angle
+        self._emma[idx] = emma
+        self._moved[idx] = moved
+        self._visibility[idx] = self._acuity_test(angle)
+        emma, moved = EMMA_fixation_time_array(angle.T, st.frequency[idx][None,:])
+        self._dist[:,idx] = dist.T
+        self._angle[:,idx] = angle.T
+        self._emma[:,idx] = emma
+        self._moved[:,idx] = moved
+        self._visibility[:,idx] = self._acuity_test(angle.T, idx)
+        self._activation_ok[self._visibility[:,idx].any(axis = 1)] = False
+
+    # Geometry of the layout has changed, so the cached tables are
+    # stale. Changes made directly to the elements are noticed through
+    # the store version.
+    def _invalidate(self):
+        self._index = None
+
+    # Compute the element x element distance, visual angle, EMMA
+    # fixation time (and whether the eyes moved) and colour visibility
+    # tables. Rows are the eye location, columns the target.
+    def _build_tables(self):
+        st = self.store
+        n = st.n
+        self._names = st.names
+        self._index = st.index
+        self._version = st.version
+        self._locs = np.stack((np.round(st.x + st.x_size/2), np.round(st.y + st.y_size/2)), axis = 1)
+        self._acuity = self._visual_angles(np.maximum(st.x_size, st.y_size))
+        self._visible_radius = self._acuity_radius()
+        self._dist = self._angle = self._emma = self._moved = self._visibility = None
+        self._activation = self._activation_ok = None
+        self._last_visible = (None, None)
+        if n > self.cache_limit:
+            return
+        # Rows of bottom-up activation by eye location, filled in as
+        # they are asked for and forgotten when the colours change.
+        self._activation = np.zeros((n, n))
+        self._activation_ok = np.zeros(n, dtype = bool)
+        self._activation_colours = st.recolours
+        everything = np.arange(n)
+        dist = self._distances(everything, everything)
+        self._angle = self._visual_angles(dist)
+        self._emma, self._moved = EMMA_fixation_time_array(self._angle, st.frequency[None,:])
+        self._visibility = self._acuity_test(self._angle)
+        self._dist = dist
+
+    # Distances between the elements at table positions rows and cols,
+    # from the table if there is one.
+    def _distances(self, rows, cols):
+        if self._dist is not None:
+            return self._dist[np.ix_(rows, cols)]
+        d = self._locs[rows][:,None,:] - self._locs[cols][None,:,:]
+        # Centres are whole pixels, so squares and their sum are exact
+        # and the sqrt matches the scalar version bit for bit.
+        return np.sqrt(d[...,0]*d[...,0] + d[...,1]*d[...,1])
+
+    # Array version of angular_size.
+    def _visual_angles(self, size):
+        return 180 * (_libm(math.atan, size / self.user_distance) / math.pi)
+
+    # Return which elements have their colour visible when the eyes
+    # are at table position i. Uses the visibility table if there is
+    # one, otherwise the last row is kept, since the activation
+    # functions usually ask for the same eye location in turn.
+    def _visible(self, i):
+        if self._visibility is not None:
+            return self._visibility[i]
+        if self._last_visible[0] != i:
+            n = len(self._names)
+            if n >= self.index_threshold:
+                # Only elements within the acuity radius can pass.
+                idx = self._spatial_index().within(self._locs[i], self._visible_radius)
+            else:
+                idx = np.arange(n)
+            visible = np.zeros(n, dtype = bool)
+            visible[idx] = self._acuity_test(self._visual_angles(self._distances([i], idx)[0]), idx)
+            self._last_visible = (i, visible)
+        return self._last_visible[1]
+
+    # Peripheral acuity: is the colour of an element at visual angle d
+    # (degrees) from the eye visible. If idx is given, d is only for
+    # the elements at those table positions.
+    def _acuity_test(self, d, idx = None):
+        acuity = self._acuity if idx is None else self._acuity[idx]
+        return (0.104*_libm(math.pow, d, 2) - 0.95*d) < acuity
+
+    # The furthest (in pixels) that any element can be from the eyes
+    # and still have its colour visible, from the largest acuity
+    # threshold and the root of the polynomial in _acuity_test. There
+    # is some slack for rounding; the exact test is done afterwards.
+    def _acuity_radius(self):
+        if not len(self._acuity):
+            return 0
+        d = (0.95 + math.sqrt(0.95*0.95 + 4*0.104*float(self._acuity.max()))) / (2*0.104)
+        if d >= 89:
+            return math.inf
+        return self.user_distance * math.tan(d * math.pi / 180) * 1.001 + 1
+
+    # Return which eye locations (by table position) the colour of
+    # element is visible from: a column of the visibility table.
+    def visible_from(self, element):
+        i = self._table_index(element)
+        if self._visibility is not None:
+            return self._visibility[:,i].copy()
+        n = len(self._names)
+        everything = np.arange(n)
+        angle = self._visual_angles(self._distances(everything, [i])[:,0])
+        return self._acuity_test(angle, np.full(n, i))
+
+    # Return the position of an element in the tables, building them
+    # if needed.
+    def _table_index(self, element):
+        self._ensure_tables()
+        return self._index[element]
+
+    def _ensure_tables(self):
+        if self._index is None or self._version != self.store.version:
+            self._build_tables()
 
     # Given two elements or their names, return the distance between them
     def element_distance(self, element1, element2):
-        # if isinstance(element1, element):
-        #     element1 = element1.name
-        # if isinstance(element2, element):
-        #     element2 = element2.name
-        # if (element1 in self.distances and element2 in self.distances[element1]) or \
-        #    (element2 in self.distances and element1 in self.distances[element2]):
-        #     return self.distances[element1][element2]
+        i = self._table_index(element1)
+        if self._dist is not None:
+            return float(self._dist[i, self._index[element2]])
 
         loc1 = self.elements[element1].loc()
         loc2 = self.elements[element2].loc()
         dist = math.sqrt(math.pow(loc1[0] - loc2[0], 2) +
                          math.pow(loc1[1] - loc2[1], 2))
-        # if element1 not in self.distances:
-        #     self.distances[element1] = {}
-        # self.distances[element1][element2] = dist
         return dist
 
     def element_size(self, element):
@@ -144,6 +610,18 @@ class ui:
     
 
     def closest_element(self, loc, elements = None):
+        if self.store.n >= self.index_threshold:
+            allowed = None
+            if elements:
+                allowed = np.zeros(self.store.n, dtype = bool)
+                allowed[[self.store.index[e] for e in elements]] = True
+            found = [self.store.names[i] for i in self._spatial_index().nearest(loc, allowed)]
+            if not found:
+                return None
+            # Ties go to the first one in the list, as below.
+            if elements:
+                return min(found, key = elements.index)
+            return min(found, key = self.store.index.get)
         if not elements:
             elements = list(self.elements.keys())
         closest_e = None
@@ -158,8 +636,23 @@ class ui:
 
         return closest_e
 
+    # closest_element for the searches. allowed is a boolean array by
+    # table position, and ties go to the element with the lowest rank.
+    def _closest_index(self, loc, allowed, rank):
+        if self.store.n >= self.index_threshold:
+            found = self._spatial_index().nearest(loc, allowed)
+        else:
+            idx = np.flatnonzero(allowed)
+            d = np.sqrt(_libm(math.pow, loc[0] - self._locs[idx,0], 2) +
+                        _libm(math.pow, loc[1] - self._locs[idx,1], 2))
+            found = idx[d == d.min()]
+        return int(min(found, key = lambda i: rank[i]))
+
     # Calculate visual distance, as degrees, between two elements.
     def visual_distance(self, element1, element2):
+        i = self._table_index(element1)
+        if self._angle is not None:
+            return float(self._angle[i, self._index[element2]])
         return 180 * (math.atan(self.element_distance(element1, element2) / self.user_distance) / math.pi)
 
     # Given size in pixels, what is the angular size.
@@ -168,25 +661,59 @@ class ui:
 
 
     def fitts_movement_time(self, elements):
-        mt = 0
-        for e in range(len(elements)-1):
-            mt += fitts_mt(self.element_distance(self.elements[elements[e]].name, self.elements[elements[e+1]].name), min(self.elements[elements[e+1]].x_size, self.elements[elements[e+1]].y_size), self.fitts_a, self.fitts_b)
-        return mt
+        if len(elements) < 2:
+            return 0
+        self._ensure_tables()
+        idx = np.array([self._index[e] for e in elements])
+        width = np.minimum(self.store.x_size, self.store.y_size)[idx[1:]]
+        mt = fitts_mt_array(self.element_distances(idx[:-1], idx[1:]), width, self.fitts_a, self.fitts_b)
+        # Add up in order, as the movements happen.
+        return sum(mt.tolist())
+
+    # Distances between pairs of elements, given as two equally long
+    # sequences of names or table positions.
+    def element_distances(self, elements1, elements2):
+        self._ensure_tables()
+        rows = np.array([self._index[e] if isinstance(e, str) else e for e in elements1], dtype = int)
+        cols = np.array([self._index[e] if isinstance(e, str) else e for e in elements2], dtype = int)
+        if self._dist is not None:
+            return self._dist[rows, cols]
+        d = self._locs[rows] - self._locs[cols]
+        return np.sqrt(d[:,0]*d[:,0] + d[:,1]*d[:,1])
+
+    # Return EMMA fixation times, and whether the eyes moved, for
+    # moving the eyes from each of eye_locs to the corresponding
+    # target.
+    def emma_times(self, targets, eye_locs):
+        self._ensure_tables()
+        rows = np.array([self._index[e] for e in eye_locs], dtype = int)
+        cols = np.array([self._index[e] for e in targets], dtype = int)
+        if self._emma is not None:
+            return self._emma[rows, cols], self._moved[rows, cols]
+        return EMMA_fixation_time_array(self._visual_angles(self.element_distances(rows, cols)), self.store.frequency[cols])
+
+    # Return the EMMA fixation times, and whether the eyes moved, for
+    # every eye location (rows) and target (columns), in element order.
+    def emma_table(self):
+        self._ensure_tables()
+        if self._emma is not None:
+            return self._emma.copy(), self._moved.copy()
+        everything = np.arange(len(self._names))
+        return EMMA_fixation_time_array(self._visual_angles(self._distances(everything, everything)), self.store.frequency[None,:])
 
     def emma_time(self, target, eye_loc = None):
         if not eye_loc:
             eye_loc = self.eye_loc
+        i = self._table_index(eye_loc)
+        if self._emma is not None:
+            j = self._index[target]
+            return float(self._emma[i, j]), bool(self._moved[i, j])
         dist = self.visual_distance(eye_loc, target)
         return self.EMMA_fixation_time(dist, freq=self.elements[target].frequency)
 
     # Eye movement and encoding time come from EMMA (Salvucci, 2001). Also
     # return if a fixation occurred.
     def EMMA_fixation_time(self, distance, freq = 0.1):
-        emma_KK = 0.006
-        emma_k = 0.4
-        emma_prep = 0.135
-        emma_exec = 0.07
-        emma_saccade = 0.002
         E = emma_KK * -math.log(freq) * math.exp(emma_k * distance)
         if E < emma_prep: return E, False
         S = emma_prep + emma_exec + emma_saccade * distance
@@ -242,13 +769,23 @@ class ui:
     ## Make an exhaustive search, with item saliency and potentially
     ## requested feature top-down information taken into account.
     def exhaustive_guided_visual_search(self, start = None, target = None, top_down = None, force_fixation = None):
+        mt, scanpath, replayed = self._guided_search(start, target, top_down, force_fixation)
+        return mt, scanpath
+
+    # The guided search. If trace is a list, the (eye, element) table
+    # positions of every element searched are appended to it, in order.
+    # If replay is such a list from an earlier search, its steps are
+    # taken as they are, without working out the activations, for as
+    # long as they start from where the eyes are and pick an element
+    # not yet searched; the search carries on from there. Also returns
+    # the number of steps replayed.
+    def _guided_search(self, start = None, target = None, top_down = None, force_fixation = None, trace = None, replay = ()):
         if not start:
             start = self.eye_loc
-        searched = [start]
         scanpath = [start]
         if start == target:
             mt_, moved = self.emma_time(start, eye_loc = start)
-            return mt_, scanpath
+            return mt_, scanpath, 0
 
         rt_pos = None
         if target in self.ltm_pos:
@@ -258,114 +795,143 @@ class ui:
         if target in self.ltm_color:
             rt_col = self.recall_time(self.ltm_color[target])
 
-        mt = 0
-        while len(searched) != len(self.elements):
-            # Figure out the next target, which is the one with
-            # largest activation, but not inhibited.
-            activation = self.bottom_up_activation(start)
+        # Elements are handled by table position here. Inhibition of
+        # return is a mask, and the activation of the unsearched
+        # elements is only recomputed when the eyes move or the
+        # top-down feature changes.
+        self._ensure_tables()
+        n = len(self._names)
+        searched = np.zeros(n, dtype = bool)
+        eye = self._index[start]
+        searched[eye] = True
+        n_searched = 1
+        current = None
+        replayed = 0
 
+        mt = 0
+        while n_searched != n:
             if rt_col and mt >= rt_col:
                 top_down = self.ltm_color_fact[target]
 
-            if top_down:
-                top_down_activation = self.top_down_activation(top_down, eye_loc = start)
-                for e in top_down_activation:
-                    if e in activation:
-                        activation[e] += top_down_activation[e]
-
-            for e in searched:
-                if e in activation:
-                    del activation[e]
-
-
-            new_target = max(activation.items(), key=lambda x: x[1])[0]
-            if rt_pos and mt >= rt_pos:
-                new_target = self.closest_element(self.ltm_pos_fact[target], elements = list(activation.keys()))
-                #print(new_target)
-
-            mt_, moved = self.emma_time(new_target, eye_loc = start)
+            if replayed == n_searched - 1 and replayed < len(replay) and replay[replayed][0] == eye and not searched[replay[replayed][1]]:
+                new_target = replay[replayed][1]
+                replayed += 1
+                current = None
+            elif current != (eye, top_down):
+                current = (eye, top_down)
+                activation, visible = self.bottom_up_activation_array(self._names[eye])
+                if top_down:
+                    activation = activation + self.top_down_activation_array(top_down, eye_loc = self._names[eye])[0]
+                # Ties go to the first one in this order, which is
+                # that of the activation dicts.
+                order = np.concatenate((np.flatnonzero(visible), np.flatnonzero(~visible)))
+                rank = np.empty(n, dtype = int)
+                rank[order] = np.arange(n)
+                # Figure out the next target, which is the one with
+                # largest activation, but not inhibited.
+                ranked = np.where(searched[order], -np.inf, activation[order])
+
+            if current is not None:
+                new_target = int(order[np.argmax(ranked)])
+            if current is not None and rt_pos and mt >= rt_pos:
+                new_target = self._closest_index(self.ltm_pos_fact[target], ~searched, rank)
+
+            if self._emma is not None:
+                mt_, moved = float(self._emma[eye, new_target]), bool(self._moved[eye, new_target])
+            else:
+                mt_, moved = self.emma_time(self._names[new_target], eye_loc = self._names[eye])
             mt += mt_
-            #print(start, new_target, moved, mt)
-            if moved: scanpath.append(new_target)
-
-            searched.append(new_target)
-            if new_target == target:
+            if moved: scanpath.append(self._names[new_target])
+            if trace is not None: trace.append((eye, new_target))
+
+            searched[new_target] = True
+            if current is not None:
+                ranked[rank[new_target]] = -np.inf
+            n_searched += 1
+            if self._names[new_target] == target:
                 break
 
-            if moved or force_fixation: start = new_target
-        return mt, scanpath
+            if moved or force_fixation: eye = new_target
+        return mt, scanpath, replayed
 
 
     def bottom_up_activation(self, eye_loc = None):
         if not eye_loc:
             eye_loc = self.eye_loc
-        # First create a visual representation of those items that have colour visible.
-        visible_elements = {}
-        for e in self.elements:
-            d = self.visual_distance(e, eye_loc)
-            if (0.104*math.pow(d,2) - 0.95*d) < self.angular_size(max(self.elements[e].x_size, self.elements[e].y_size)):
-                visible_elements[e] = self.elements[e]
-        # Then iterate bottom-up activation
-        activation = {}
-        for e in visible_elements:
-            activation[e] = 0
-            for e2 in visible_elements:
-                if not e == e2:
-                    if visible_elements[e].color != visible_elements[e2].color:
-                        activation[e] += 1/math.sqrt(self.element_distance(e, e2))
-
-        # Put elements without any bottom-up activation as zero-activation
-        for e in self.elements:
-            if e not in activation:
-                activation[e] = 0
+        return self._activation_dict(*self.bottom_up_activation_array(eye_loc))
 
-        return activation
+    # Return the bottom-up activation of all elements as an array in
+    # the order of self.elements, and which of them were visible. Every
+    # visible element is activated by visible elements of a different
+    # colour, in proportion to 1/sqrt(distance).
+    def bottom_up_activation_array(self, eye_loc = None):
+        if not eye_loc:
+            eye_loc = self.eye_loc
+        i = self._table_index(eye_loc)
+        visible = self._visible(i)
+        if self._activation is not None:
+            if self._activation_colours != self.store.recolours:
+                self._activation_ok[:] = False
+                self._activation_colours = self.store.recolours
+            if self._activation_ok[i]:
+                return self._activation[i].copy(), visible
+        idx = np.flatnonzero(visible)
+        colors = self.store.color[idx]
+        with np.errstate(divide = 'ignore'):
+            pairs = np.where(colors[:,None] != colors[None,:], 1 / np.sqrt(self._distances(idx, idx)), 0.0)
+        activation = np.zeros(len(self._names))
+        if len(idx):
+            # cumsum adds up in element order, like the original loop,
+            # so the sums are exactly the same.
+            activation[idx] = np.cumsum(pairs, axis = 1)[:,-1]
+        if self._activation is not None:
+            self._activation[i] = activation
+            self._activation_ok[i] = True
+        return activation, visible
 
     # Given a requested feature, return the top-down activation of elements.
     def top_down_activation(self, top_down, eye_loc = None):
         if not eye_loc:
             eye_loc = self.eye_loc
-        # First set default 0.5 for unseen features
-        activation = {}
-        for e in self.elements:
-            activation[e] = 0.5
-        # Then create a visual representation of those items that have colour visible.
-        visible_elements = {}
-        for e in self.elements:
-            d = self.visual_distance(e, eye_loc)
-            #print(e, d, (0.104*math.pow(d,2))-(0.95*d),self.angular_size(max(self.elements[e].x_size, self.elements[e].y_size)))
-            if (0.104*math.pow(d,2) - 0.95*d) < self.angular_size(max(self.elements[e].x_size, self.elements[e].y_size)):
-                visible_elements[e] = self.elements[e]
-        # Then iterate bottom-up activation
-        for e in visible_elements:
-            activation[e] = 0
-            if self.elements[e].color == top_down:
-                activation[e] += 1
-
-        # Put elements without any top-down activation as zero-activation
-        # for e in self.elements:
-        #     if e not in activation:
-        #         activation[e] = 0
-
-        return activation
+        activation, visible = self.top_down_activation_array(top_down, eye_loc)
+        return dict(zip(self._names, activation.tolist()))
+
+    # Array version of top_down_activation. Elements whose colour is
+    # not visible get 0.5, visible ones 1 if they have the requested
+    # colour and 0 otherwise.
+    def top_down_activation_array(self, top_down, eye_loc = None):
+        if not eye_loc:
+            eye_loc = self.eye_loc
+        visible = self._visible(self._table_index(eye_loc))
+        matches = self.store.color == self.store.color_codes.get(top_down, -1)
+        activation = np.where(visible, matches, 0.5)
+        return activation, visible
 
     def total_activation(self, top_down = None, eye_loc = None):
         if not eye_loc:
             eye_loc = self.eye_loc
-        activation = self.bottom_up_activation(eye_loc)
+        activation, visible = self.bottom_up_activation_array(eye_loc)
         # Multiplier for bottom-up
-        for e in activation:
-            activation[e] = activation[e]*1.1
+        activation = activation*1.1
         if top_down:
-            top_down_activation = self.top_down_activation(top_down, eye_loc = eye_loc)
-            for e in top_down_activation:
-                activation[e] += 0.45*top_down_activation[e]
-        return activation
+            activation += 0.45*self.top_down_activation_array(top_down, eye_loc = eye_loc)[0]
+        return self._activation_dict(activation, visible)
+
+    # Turn an activation array into a dict with the visible elements
+    # first, as the original loops built them. The order matters, as
+    # max() over the dict decides ties by it.
+    def _activation_dict(self, activation, visible):
+        result = {}
+        for i in np.flatnonzero(visible):
+            result[self._names[i]] = float(activation[i])
+        for i in np.flatnonzero(~visible):
+            result[self._names[i]] = float(activation[i])
+        return result
 
     def WHo_mt(self, start, target, sigma, k_alpha = 0.12):
-        x0 = 0.092
-        y0 = 0.0018
-        alpha = 0.6
+        x0 = WHo_x0
+        y0 = WHo_y0
+        alpha = WHo_alpha
         x_min = 0.006
         x_max = 0.06
 
@@ -379,6 +945,25 @@ class ui:
         return mt
 
 
+# Array versions of ui.EMMA_fixation_time, fitts_mt and ui.WHo_mt,
+# taking and returning numpy arrays (anything that broadcasts). The
+# operations are done in the same order as in the scalar versions, so
+# that the results are identical.
+
+# Return the fixation times and whether the eyes moved, for visual
+# distances (degrees) and target frequencies.
+def EMMA_fixation_time_array(distance, freq = 0.1):
+    distance = np.asarray(distance, dtype = float)
+    neg_log = -_libm(math.log, freq)
+    E = emma_KK * neg_log * _libm(math.exp, emma_k * distance)
+    S = emma_prep + emma_exec + emma_saccade * distance
+    E_new = (emma_k * neg_log)
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        T = (1 - (S / E)) * E_new
+    moved = E >= emma_prep
+    mt = np.where(moved, np.where(E <= S, S, S + T), E)
+    return mt, moved
+
 # Given the constants a and b, the distance to the target and its
 # width, return the Fitts' law based movement time prediction. Using
 # formula from Mackenzie (1992).
@@ -388,258 +973,33 @@ def fitts_mt(distance, width, a = 0.230, b = 0.166):
     else:
         return a + b * math.log(distance/width + 1, 2)
 
-# Test
-test_ui = ui()
-
-test_ui.add_element("logo", 10, 10, 10, 10, color = "grey")
-test_ui.add_element("logo2", 20, 20, 10, 10, color = "yellow")
-test_ui.add_element("search", 100, 10, 100, 10, color = "blue")
-test_ui.add_element("button", 500, 300, 25, 20, color = "green")
-test_ui.add_element("search", 1000, 1000, 100, 100, color = "blue")
-test_ui.add_element("e1", 50, 300, 25, 20, color = "green")
-test_ui.add_element("e2", 60, 700, 25, 20, color = "green")
-
-
-test_ui.fitts_movement_time(["logo","search","button"])
-
-# test_ui.get_task_coordinates(["logo","search"])
-
-import matplotlib.pyplot as plt
-# %matplotlib notebook
-
-# If path is provided as a list of element names, it is also drawn.
-def visualise_UI(ui, path = [], show_text = True, show_fixation = False, scanpath = False, annotate = False):
-
-    max_x = 0
-    max_y = 0
-
-    plt.close() # close any existing plot
-    plt.axes()
-    plt.xlim(0, ui.x_size)
-    plt.ylim(0, ui.y_size)
-
-    plt.gca().invert_yaxis()
-    for e in list(ui.elements.values()):
-        if e.x+e.x_size > max_x: max_x = e.x+e.x_size
-        if e.y+e.y_size > max_y: max_y = e.y+e.y_size
-        rectangle = plt.Rectangle((e.x, e.y), e.x_size, e.y_size, fc = e.color)
-        plt.gca().add_patch(rectangle)
-        if show_text:
-            plt.text(e.x, e.y, e.name)
-            if e.data:
-                plt.text(e.x, e.y+100, str(e.data))
-
-    for p in range(len(path)-1):
-        if isinstance(path[p], str):
-            loc1 = ui.elements[path[p]].loc()
-            # e1_h = ui.elements[path[p]].y_size
-            # e2_h = ui.elements[path[p]].y_size
-        else:
-            loc1 = path[p]
-        if isinstance(path[p+1], str):
-            col = "black"
-            loc2 = ui.elements[path[p+1]].loc()
-        else:
-            col = "red"
-            loc2 = path[p+1]
-            
-        plt.plot([loc1[0],loc2[0]], [loc1[1],loc2[1]], color = "black") # , marker = 'o'
-        circle = plt.Circle((loc2[0],loc2[1]), 30, fc = col)
-        plt.gca().add_patch(circle)
-        
-
-        if annotate:
-            if p == 0:
-                plt.text(loc1[0]+20, loc1[1]+20, str(annotate[p]))
-            plt.text(loc2[0]+20, loc2[1]+20, str(annotate[p+1]))
-
-    if scanpath:
-        circle_size = max(max_x, max_y) / 20 # make sure fixation circle is large enough
-        loc = ui.elements[scanpath[0]].loc()
-        circle = plt.Circle((loc[0],loc[1]), circle_size, fc = "red", alpha = 0.2)
-        plt.gca().add_patch(circle)
-        circle = plt.Circle((loc[0],loc[1]), circle_size+1, fc = "black", fill = False)
-        plt.gca().add_patch(circle)
-
-        for p in range(len(scanpath)-1):
-            loc1 = ui.elements[scanpath[p]].loc()
-            loc2 = ui.elements[scanpath[p+1]].loc()
-            e1_h = ui.elements[scanpath[p]].y_size
-            e2_h = ui.elements[scanpath[p]].y_size
-            plt.plot([loc1[0],loc2[0]], [loc1[1],loc2[1]], color = "red", marker = 'o')
-            circle = plt.Circle((loc2[0],loc2[1]), circle_size, fc = "red", alpha = 0.2)
-            plt.gca().add_patch(circle)
-            circle = plt.Circle((loc2[0],loc2[1]), circle_size+1, fc = "black", fill = False)
-            plt.gca().add_patch(circle)
-
-    if show_fixation:
-        circle_size = max(max_x, max_y) / 20 # make sure fixation circle is large enough
-        e = ui.elements[ui.eye_loc]
-        circle = plt.Circle((e.x, e.y), circle_size, fc = "red", alpha = 0.2)
-        plt.gca().add_patch(circle)
-
-    plt.axis('scaled')
-    plt.show()
-
-def visualise_exhaustive_search(ui, start = None, target = None):
-    search = ui.exhaustive_visual_search(start = start, target = target)
-    visualise_UI(ui, scanpath = search[1])
-    print("Total search time:", search[0])
-    print("Total number of fixations:",len(search[1]))
-
-def visualise_exhaustive_guided_search(ui, start = None, target = None, top_down = None, force_fixation = None):
-    search = ui.exhaustive_guided_visual_search(start = start, target = target, top_down = top_down, force_fixation = force_fixation)
-    visualise_UI(ui, scanpath = search[1])
-    print("Total search time:", search[0])
-    print("Total number of fixations:",len(search[1]))
-
-big_ui = ui(1920, 1280)
-m=8
-big_ui = ui(1920, 1280)
-big_ui.add_element("e1", 10*m,30*m,30*m,20*m, color ="red")
-big_ui.add_element("a2", 10*m,60*m,30*m,20*m, color ="red")
-big_ui.add_element("a3", 10*m,90*m,30*m,20*m, color ="red")
-big_ui.add_element("a4", 10*m,120*m,30*m,20*m, color ="red")
-
-big_ui.add_element("b1", 80*m,30*m,30*m,20*m, color ="green")
-big_ui.add_element("b2", 80*m,60*m,30*m,20*m, color ="green")
-big_ui.add_element("b3", 80*m,90*m,30*m,20*m, color ="green")
-big_ui.add_element("b4", 80*m,120*m,30*m,20*m, color ="green")
-
-big_ui.add_element("e2", 150*m,30*m,30*m,20*m, color ="blue")
-big_ui.add_element("c2", 150*m,60*m,30*m,20*m, color ="blue")
-big_ui.add_element("c3", 150*m,90*m,30*m,20*m, color ="blue")
-big_ui.add_element("c4", 150*m,120*m,30*m,20*m, color ="blue")
-
-big_ui.add_element("d1", 230*m,30*m,30*m,20*m, color ="grey")
-big_ui.add_element("d2", 230*m,60*m,30*m,20*m, color ="grey")
-big_ui.add_element("d3", 230*m,90*m,30*m,20*m, color ="grey")
-big_ui.add_element("d4", 230*m,120*m,30*m,20*m, color ="black")
-
-big_ui.add_element("t1", 130*m,0*m,30*m,20*m, color ="yellow")
-big_ui.add_element("t2", 170*m,0*m,30*m,20*m, color ="yellow")
-big_ui.add_element("t3", 210*m,0*m,30*m,20*m, color ="yellow")
-big_ui.add_element("e3", 250*m,0*m,30*m,20*m, color ="yellow")
-
-#big_ui.learn_element_pos("a4", "expert")
-# big_ui.learn_all_elements("expert")
-
-# #visualise_exhaustive_guided_search(big_ui, target = "d4")
-# big_ui.swap_elements("c4","d4")
-# visualise_exhaustive_guided_search(big_ui, target = "d4")
-
-# colorbad_ui = ui(1920, 1280)
-# colorbad_ui.add_element("a1", 10*m,30*m,30*m,20*m, color ="red")
-# colorbad_ui.add_element("a2", 10*m,60*m,30*m,20*m, color ="green")
-# colorbad_ui.add_element("a3", 10*m,90*m,30*m,20*m, color ="blue")
-# colorbad_ui.add_element("a4", 10*m,120*m,30*m,20*m, color ="grey")
-
-# colorbad_ui.add_element("b1", 80*m,30*m,30*m,20*m, color ="green")
-# colorbad_ui.add_element("b2", 80*m,60*m,30*m,20*m, color ="grey")
-# colorbad_ui.add_element("b3", 80*m,90*m,30*m,20*m, color ="red")
-# colorbad_ui.add_element("b4", 80*m,120*m,30*m,20*m, color ="blue")
-
-# colorbad_ui.add_element("c1", 150*m,30*m,30*m,20*m, color ="blue")
-# colorbad_ui.add_element("c2", 150*m,60*m,30*m,20*m, color ="grey")
-# colorbad_ui.add_element("c3", 150*m,90*m,30*m,20*m, color ="red")
-# colorbad_ui.add_element("c4", 150*m,120*m,30*m,20*m, color ="green")
-
-# colorbad_ui.add_element("d1", 230*m,30*m,30*m,20*m, color ="blue")
-# colorbad_ui.add_element("d2", 230*m,60*m,30*m,20*m, color ="grey")
-# colorbad_ui.add_element("d3", 230*m,90*m,30*m,20*m, color ="red")
-# colorbad_ui.add_element("d4", 230*m,120*m,30*m,20*m, color ="green")
-
-# colorbad_ui.add_element("t1", 130*m,0*m,30*m,20*m, color ="red")
-# colorbad_ui.add_element("t2", 170*m,0*m,30*m,20*m, color ="blue")
-# colorbad_ui.add_element("t3", 210*m,0*m,30*m,20*m, color ="grey")
-# colorbad_ui.add_element("t4", 250*m,0*m,30*m,20*m, color ="green")
-
-# res = []
-# for i in range(1000):
-#     start = random.choice(list(color_ui.elements.keys()))
-#     start = "t1"
-#     # target = random.choice(list(color_ui.elements.keys()))
-#     # target = "c4"
-#     # color = color_ui.elements[target].color
-#     res.append(color_ui.exhaustive_guided_visual_search(start = start)[0])
-# print(np.mean(res))
-
-# res = []
-# for i in range(1000):
-#     start = random.choice(list(colorbad_ui.elements.keys()))
-#     start = "t1"
-#     # target = random.choice(list(colorbad_ui.elements.keys()))
-#     # target = "c4"
-#     # color = colorbad_ui.elements[target].color
-#     res.append(colorbad_ui.exhaustive_guided_visual_search(start = start)[0])
-# print(np.mean(res))
-
-# target = "t4"
-#visualise_exhaustive_guided_search(color_ui, start = "t1")
-#visualise_exhaustive_guided_search(colorbad_ui, start = "t1")
-
-# print(color_ui.exhaustive_guided_visual_search(start = "t2"))
-# print(colorbad_ui.exhaustive_guided_visual_search(start = "t2"))
-
-# Define disjunctive small and large layouts
-disj_small = ui(1900,1280)
-m_size = 12
-m_pos = 10
-alt_color = "blue"
-disj_small.add_element("e1", 20*m_pos, 20*m_pos, 20*m_size, 20*m_size, color = alt_color)
-disj_small.add_element("e2", 40*m_pos, 80*m_pos, 20*m_size, 20*m_size, color = alt_color)
-disj_small.add_element("e3", 10*m_pos, 120*m_pos, 20*m_size, 20*m_size, color = alt_color)
-disj_small.add_element("e4", 70*m_pos, 120*m_pos, 20*m_size, 20*m_size, color = "blue")
-disj_small.add_element("e5", 100*m_pos, 50*m_pos, 20*m_size, 20*m_size, color = alt_color)
-disj_small.add_element("e6", 75*m_pos, 80*m_pos, 20*m_size, 20*m_size, color = "blue")
-disj_small.add_element("e7", 70*m_pos, 20*m_pos, 20*m_size, 20*m_size, color = "blue")
-disj_small.add_element("e8", 110*m_pos, 90*m_pos, 20*m_size, 20*m_size, color = "red")
-disj_small.eye_loc = "e7"
-
-disj_large = ui(1900, 1280)
-m_size = 12
-m_pos = 10
-alt_color = "blue"
-alt_color2 = "blue"
-disj_large.add_element("e1", 20*m_pos, 20*m_pos, 20*m_size, 20*m_size, color = alt_color)
-disj_large.add_element("e2", 40*m_pos, 90*m_pos, 20*m_size, 20*m_size, color = alt_color)
-disj_large.add_element("e3", 10*m_pos, 120*m_pos, 20*m_size, 20*m_size, color = "blue")
-disj_large.add_element("e4", 70*m_pos, 120*m_pos, 20*m_size, 20*m_size, color = alt_color)
-disj_large.add_element("e5", 70*m_pos, 20*m_pos, 20*m_size, 20*m_size, color = alt_color2)
-disj_large.add_element("e6", 100*m_pos, 100*m_pos, 20*m_size, 20*m_size, color = alt_color)
-disj_large.add_element("e7", 80*m_pos, 50*m_pos, 20*m_size, 20*m_size, color = "blue")
-disj_large.add_element("e8", 120*m_pos, 130*m_pos, 20*m_size, 20*m_size, color = "red")
-disj_large.add_element("e9", 75*m_pos, 80*m_pos, 20*m_size, 20*m_size, color = "blue")
-disj_large.add_element("e10", 50*m_pos, 160*m_pos, 20*m_size, 20*m_size, color = "blue")
-disj_large.add_element("e11", 110*m_pos, 160*m_pos, 20*m_size, 20*m_size, color = alt_color)
-disj_large.add_element("e12", 140*m_pos, 100*m_pos, 20*m_size, 20*m_size, color = "blue")
-disj_large.add_element("e13", 170*m_pos, 120*m_pos, 20*m_size, 20*m_size, color = alt_color)
-disj_large.add_element("e14", 30*m_pos, 60*m_pos, 20*m_size, 20*m_size, color = alt_color2)
-disj_large.add_element("e15", 120*m_pos, 50*m_pos, 20*m_size, 20*m_size, color = alt_color2)
-disj_large.add_element("e16", 120*m_pos, 20*m_pos, 20*m_size, 20*m_size, color = alt_color)
-disj_large.eye_loc = "e7"
-
-
-# visualise_UI(disj_large)
-
-# visualise_exhaustive_guided_search(disj_large, start = "e7", target = "e8", top_down = "red")
-
-# disj_small.modify_element("e2", "color", "red")
-# visualise_exhaustive_guided_search(disj_small, start = "e7", target = "e8", top_down = "red")
-
-# my_ui = ui()
-# my_ui.add_element("e1", 10, 10, 10, 10)
-# my_ui.add_element("e2", 210, 10, 10, 10)
-# my_ui.emma_time("e1", "e2")
-# visualise_exhaustive_search(my_ui)
-# my_ui.add_element("e3", 120, 100, 40, 40)
-# visualise_exhaustive_search(my_ui)
-
-# s = 0
-# for i in range(1,20):
-#     s+=math.pow(i*60+2*3600,-0.5)
-
-#s = math.pow(60,-0.5)+math.pow(120,-0.5)
-
-# test_ui.learn_element_color("button", 5)
-# visualise_exhaustive_guided_search(test_ui, target = "button")
+def fitts_mt_array(distance, width, a = 0.230, b = 0.166):
+    distance, width = np.broadcast_arrays(np.asarray(distance, dtype = float), np.asarray(width, dtype = float))
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        mt = a + b * (_libm(math.log, distance/width + 1) / math.log(2))
+    return np.where(distance == 0, a, mt)
+
+# Given pointing distances (pixels) and the spread of endpoints sigma,
+# return the WHo movement times.
+def WHo_mt_array(distance, sigma, k_alpha = 0.12):
+    distance = np.asarray(distance, dtype = float)
+    distance = np.where(distance == 0, 0.0000001, distance)
+    return _libm(math.pow, (k_alpha * _libm(math.pow, ((sigma - WHo_y0) / distance), (WHo_alpha - 1))), 1 / WHo_alpha) + WHo_x0
+
+# The plotting functions (visualise.py) and the example layouts
+# (layouts.py) are loaded on first use, so that importing the model
+# does not import matplotlib or build the examples.
+_visualise_names = ["visualise_UI", "visualise_exhaustive_search", "visualise_exhaustive_guided_search"]
+_layout_names = ["test_ui", "big_ui", "disj_small", "disj_large"]
+
+def __getattr__(name):
+    if name in _visualise_names:
+        import visualise
+        module = visualise
+    elif name in _layout_names:
+        import layouts
+        module = layouts
+    else:
+        raise AttributeError("module 'ui' has no attribute '" + name + "'")
+    globals()[name] = getattr(module, name)
+    return globals()[name]
@@ -0,0 +1,91 @@
+# Plotting of layouts and scanpaths. ui.visualise_UI and the search
+# visualisations load this module on first use.
+
+import matplotlib.pyplot as plt
+# %matplotlib notebook
+
+# If path is provided as a list of element names, it is also drawn.
+def visualise_UI(ui, path = [], show_text = True, show_fixation = False, scanpath = False, annotate = False):
+
+    max_x = 0
+    max_y = 0
+
+    plt.close() # close any existing plot
+    plt.axes()
+    plt.xlim(0, ui.x_size)
+    plt.ylim(0, ui.y_size)
+
+    plt.gca().invert_yaxis()
+    for e in list(ui.elements.values()):
+        if e.x+e.x_size > max_x: max_x = e.x+e.x_size
+        if e.y+e.y_size > max_y: max_y = e.y+e.y_size
+        rectangle = plt.Rectangle((e.x, e.y), e.x_size, e.y_size, fc = e.color)
+        plt.gca().add_patch(rectangle)
+        if show_text:
+            plt.text(e.x, e.y, e.name)
+            if e.data:
+                plt.text(e.x, e.y+100, str(e.data))
+
+    for p in range(len(path)-1):
+        if isinstance(path[p], str):
+            loc1 = ui.elements[path[p]].loc()
+            # e1_h = ui.elements[path[p]].y_size
+            # e2_h = ui.elements[path[p]].y_size
+        else:
+            loc1 = path[p]
+        if isinstance(path[p+1], str):
+            col = "black"
+            loc2 = ui.elements[path[p+1]].loc()
+        else:
+            col = "red"
+            loc2 = path[p+1]
+            
+        plt.plot([loc1[0],loc2[0]], [loc1[1],loc2[1]], color = "black") # , marker = 'o'
+        circle = plt.Circle((loc2[0],loc2[1]), 30, fc = col)
+        plt.gca().add_patch(circle)
+        
+
+        if annotate:
+            if p == 0:
+                plt.text(loc1[0]+20, loc1[1]+20, str(annotate[p]))
+            plt.text(loc2[0]+20, loc2[1]+20, str(annotate[p+1]))
+
+    if scanpath:
+        circle_size = max(max_x, max_y) / 20 # make sure fixation circle is large enough
+        loc = ui.elements[scanpath[0]].loc()
+        circle = plt.Circle((loc[0],loc[1]), circle_size, fc = "red", alpha = 0.2)
+        plt.gca().add_patch(circle)
+        circle = plt.Circle((loc[0],loc[1]), circle_size+1, fc = "black", fill = False)
+        plt.gca().add_patch(circle)
+
+        for p in range(len(scanpath)-1):
+            loc1 = ui.elements[scanpath[p]].loc()
+            loc2 = ui.elements[scanpath[p+1]].loc()
+            e1_h = ui.elements[scanpath[p]].y_size
+            e2_h = ui.elements[scanpath[p]].y_size
+            plt.plot([loc1[0],loc2[0]], [loc1[1],loc2[1]], color = "red", marker = 'o')
+            circle = plt.Circle((loc2[0],loc2[1]), circle_size, fc = "red", alpha = 0.2)
+            plt.gca().add_patch(circle)
+            circle = plt.Circle((loc2[0],loc2[1]), circle_size+1, fc = "black", fill = False)
+            plt.gca().add_patch(circle)
+
+    if show_fixation:
+        circle_size = max(max_x, max_y) / 20 # make sure fixation circle is large enough
+        e = ui.elements[ui.eye_loc]
+        circle = plt.Circle((e.x, e.y), circle_size, fc = "red", alpha = 0.2)
+        plt.gca().add_patch(circle)
+
+    plt.axis('scaled')
+    plt.show()
+
+def visualise_exhaustive_search(ui, start = None, target = None):
+    search = ui.exhaustive_visual_search(start = start, target = target)
+    visualise_UI(ui, scanpath = search[1])
+    print("Total search time:", search[0])
+    print("Total number of fixations:",len(search[1]))
+
+def visualise_exhaustive_guided_search(ui, start = None, target = None, top_down = None, force_fixation = None):
+    search = ui.exhaustive_guided_visual_search(start = start, target = target, top_down = top_down, force_fixation = force_fixation)
+    visualise_UI(ui, scanpath = search[1])
+    print("Total search time:", search[0])
+    print("Total number of fixations:",len(search[1]))